@@ -1,5 +1,6 @@
 # app_server.py
 import os
+import json
 from pathlib import Path
 import shutil
 from typing import List
@@ -9,6 +10,7 @@ from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from langchain_community.vectorstores import FAISS
@@ -243,11 +245,12 @@ def debug_info():
     }
 
 @app.post("/chat", response_model=ChatOut)
-def chat(body: ChatIn):
+async def chat(body: ChatIn):
     if not APP_READY or graph is None:
         raise HTTPException(status_code=503, detail=f"Service not ready: {APP_ERROR}")
     try:
-        res = graph.invoke({"query": body.query}, config={"run_name": "ChatQuery"})
+        # Async node'lar: retrieval thread'de, LLM isteği event loop üzerinde beklenir
+        res = await graph.ainvoke({"query": body.query}, config={"run_name": "ChatQuery"})
         return ChatOut(
             answer=res.get("answer") or "",
             citations=res.get("citations") or [],
@@ -256,6 +259,44 @@ def chat(body: ChatIn):
     except Exception as e:
         logger.error(f"Chat error: {e}")
         raise HTTPException(status_code=500, detail=f"Chat processing failed: {str(e)}")
+
+@app.post("/chat/stream")
+async def chat_stream(body: ChatIn):
+    """
+    NDJSON stream: generate node'unun LLM token'ları geldikçe {"token": ...} satırları,
+    en sonda /chat ile aynı alanlara sahip tam cevap satırı ({"answer", "citations", "suggestions"}).
+    Cache hit / hazır yanıt durumlarında sadece son satır gönderilir.
+    """
+    if not APP_READY or graph is None:
+        raise HTTPException(status_code=503, detail=f"Service not ready: {APP_ERROR}")
+
+    async def _events():
+        res = {}
+        try:
+            async for mode, chunk in graph.astream(
+                {"query": body.query},
+                config={"run_name": "ChatQuery"},
+                stream_mode=["messages", "values"],
+            ):
+                if mode == "values":
+                    res = chunk
+                    continue
+                message, metadata = chunk
+                if metadata.get("langgraph_node") == "generate" and message.content:
+                    yield json.dumps({"token": message.content}, ensure_ascii=False) + "\n"
+        except Exception as e:
+            logger.error(f"Chat stream error: {e}")
+            yield json.dumps({"error": f"Chat processing failed: {str(e)}"}, ensure_ascii=False) + "\n"
+            return
+
+        out = {
+            "answer": res.get("answer") or "",
+            "citations": res.get("citations") or [],
+            "suggestions": res.get("suggestions") or [],
+        }
+        yield json.dumps(out, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(_events(), media_type="application/x-ndjson")
 # -------------------------------------
 
 # ---------- Mount static UI at root ----------
@@ -10,6 +10,9 @@ from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import FAISS
 
+# Türkçe karakterler (tek geçişte aranır)
+TURKISH_CHARS_RE = re.compile('[çğıöşüÇĞIİÖŞÜ]')
+
 class OptimizedChunker:
     """Enhanced chunking strategy for technical documentation"""
     
@@ -175,8 +178,7 @@ class OptimizedChunker:
     
     def _detect_language(self, text: str) -> str:
         """Simple language detection"""
-        turkish_chars = set('çğıöşüÇĞIİÖŞÜ')
-        has_turkish = any(char in text for char in turkish_chars)
+        has_turkish = TURKISH_CHARS_RE.search(text) is not None
         
         turkish_words = ['ve', 'bir', 'bu', 'için', 'ile', 'olan', 'nasıl', 'nedir']
         english_words = ['the', 'and', 'or', 'how', 'what', 'with', 'from', 'that']
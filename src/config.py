@@ -42,6 +42,23 @@ ENTITY_EXTRACTION_MODEL = "en_core_web_sm"
 GRAPH_EMBEDDING_DIM = 384
 MULTI_HOP_MAX_DEPTH = 2
 MAX_GRAPH_ENTITIES = 5
+GRAPH_RETRIEVAL_CACHE_SIZE = int(os.getenv("GRAPH_RETRIEVAL_CACHE_SIZE", "512"))  # Aynı sorgu için graph sonucu (LRU)
+QUERY_ANALYSIS_CACHE_SIZE = int(os.getenv("QUERY_ANALYSIS_CACHE_SIZE", "4096"))  # Sorgu routing/expansion sonuçları (LRU)
+
+# Semantic response cache (sadece temperature=0 üretimde kullanılır)
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") == "1"
+RESPONSE_CACHE_THRESHOLD = float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.95"))  # Query-query cosine
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))  # Saniye
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+
+# Retrieval cache (semantik olarak eşdeğer sorgular BM25+vektör+graph aramasını atlar)
+RETRIEVAL_CACHE_ENABLED = os.getenv("RETRIEVAL_CACHE_ENABLED", "1") == "1"
+RETRIEVAL_CACHE_THRESHOLD = float(os.getenv("RETRIEVAL_CACHE_THRESHOLD", "0.95"))  # Query-query cosine
+RETRIEVAL_CACHE_TTL = float(os.getenv("RETRIEVAL_CACHE_TTL", "600"))  # Saniye
+RETRIEVAL_CACHE_MAX_ENTRIES = int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", "1000"))
+
+# Prompt'a giren her doküman için karakter bütçesi (sorguyla en ilgili pasaj tutulur, 0 = kırpma yok)
+CONTEXT_DOC_MAX_CHARS = int(os.getenv("CONTEXT_DOC_MAX_CHARS", "800"))
 
 BASE_DOC_URL = os.getenv("BASE_DOC_URL", "https://user.netmera.com")
 
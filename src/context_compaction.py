@@ -0,0 +1,90 @@
+"""
+Query-aware extractive compaction of retrieved documents before prompting.
+Keeps the contiguous passage that shares the most terms with the query within a
+character budget instead of cutting every document at a fixed prefix.
+"""
+
+import re
+from typing import List, Tuple
+
+# Kod blokları bölünmez; diğer metin satır satır ele alınır
+_BLOCK_RE = re.compile(r"```.*?(?:```|\Z)|[^\n]+", re.DOTALL)
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+_TOKEN_RE = re.compile(r"\w+")
+
+_LONG_LINE = 200  # Bundan uzun düz metin satırları cümlelere bölünür
+_GAP_MARKER = "\n...\n"
+
+# Soru kalıbı kelimeleri sinyal taşımaz
+_STOPWORDS = frozenset([
+    "the", "and", "how", "what", "which", "with", "for", "are", "can", "does", "from", "this", "that",
+    "nasıl", "nedir", "için", "ile", "hangi", "nerede", "neden", "bir",
+])
+
+def _segments(text: str) -> List[Tuple[int, int]]:
+    """(start, end) spans of code blocks, short lines and sentences of long lines"""
+    spans = []
+    for block in _BLOCK_RE.finditer(text):
+        start, end = block.span()
+        if end - start <= _LONG_LINE or text.startswith("```", start):
+            spans.append((start, end))
+            continue
+        for sep in _SENTENCE_END_RE.finditer(text, start, end):
+            spans.append((start, sep.start()))
+            start = sep.end()
+        spans.append((start, end))
+    return spans
+
+def _terms(text: str) -> set:
+    return {token for token in _TOKEN_RE.findall(text.lower()) if len(token) >= 3} - _STOPWORDS
+
+def compact_document(text: str, query: str, max_chars: int = 800) -> str:
+    """
+    Shrink text to at most max_chars around the passage most relevant to query.
+
+    The document is split into code blocks, lines and (for long lines)
+    sentences, each scored by the number of distinct query terms it contains.
+    The contiguous run of segments with the highest total score that fits the
+    budget is kept, preceded by the first segment (usually the heading) when
+    there is room. Falls back to a plain prefix cut when no segment shares a
+    query term. max_chars <= 0 disables compaction.
+    """
+    text = text.strip()
+    if max_chars <= 0 or len(text) <= max_chars:
+        return text
+
+    query_terms = _terms(query)
+    spans = _segments(text)
+    scores = [len(query_terms & _terms(text[start:end])) for start, end in spans]
+    if not any(scores):
+        return text[:max_chars]
+
+    # Başlık (ilk segment) sığıyorsa pasajın önüne eklenir; bütçesi baştan ayrılır
+    head_cost = spans[0][1] + len(_GAP_MARKER)
+    budget = max_chars - head_cost if head_cost <= max_chars // 2 else max_chars
+
+    # En yüksek skorlu, bütçeye sığan ardışık segment penceresi (two-pointer)
+    best_score, best_left = 0, None
+    window_score = 0
+    left = 0
+    for right in range(len(spans)):
+        window_score += scores[right]
+        while left < right and spans[right][1] - spans[left][0] > budget:
+            window_score -= scores[left]
+            left += 1
+        if spans[right][1] - spans[left][0] <= budget and window_score > best_score:
+            best_score, best_left = window_score, left
+
+    if best_left is None:
+        return text[:max_chars]
+
+    # Pencereyi ilk ilgili segmentten başlat, kalan bütçeyi takip eden içerikle (adımlar, kod) doldur
+    left = next(i for i in range(best_left, len(spans)) if scores[i])
+    right = left
+    while right + 1 < len(spans) and spans[right + 1][1] - spans[left][0] <= budget:
+        right += 1
+
+    passage = text[spans[left][0]:spans[right][1]]
+    if left > 0 and budget < max_chars:
+        return text[:spans[0][1]] + _GAP_MARKER + passage
+    return passage
@@ -12,6 +12,9 @@ from langchain_community.vectorstores import FAISS
 import json
 import time
 
+# Türkçe karakterler (tek geçişte aranır)
+TURKISH_CHARS_RE = re.compile('[çğıöşüÇĞIİÖŞÜ]')
+
 class EnhancedSemanticChunker:
     """Enhanced chunking with overlapping summaries and adaptive sizing"""
     
@@ -346,8 +349,7 @@ class EnhancedSemanticChunker:
 
     def _detect_language(self, text: str) -> str:
         """Enhanced language detection"""
-        turkish_chars = set('çğıöşüÇĞIİÖŞÜ')
-        has_turkish = any(char in text for char in turkish_chars)
+        has_turkish = TURKISH_CHARS_RE.search(text) is not None
         
         turkish_words = ['ve', 'bir', 'bu', 'için', 'ile', 'olan', 'nasıl', 'nedir', 'hangi', 'nerede']
         english_words = ['the', 'and', 'or', 'how', 'what', 'with', 'from', 'that', 'which', 'where']
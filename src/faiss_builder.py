@@ -29,6 +29,9 @@ ANALYSIS_DIR = os.path.join(DATA_DIR, "analysis")
 os.makedirs(CHUNKS_DIR, exist_ok=True)
 os.makedirs(ANALYSIS_DIR, exist_ok=True)
 
+# Türkçe karakterler (tek geçişte aranır)
+TURKISH_CHARS_RE = re.compile('[çğıöşüÇĞIİÖŞÜ]')
+
 # Source line regex
 SOURCE_LINE_RE = re.compile(r"^\[SOURCE_URL\]:\s*(?P<url>\S+)\s*$", flags=re.IGNORECASE)
 
@@ -128,8 +131,7 @@ def detect_content_type(text: str) -> str:
 
 def detect_language(text: str) -> str:
     """Dil tespiti - Türkçe vs İngilizce"""
-    turkish_chars = set('çğıöşüÇĞIİÖŞÜ')
-    has_turkish_chars = any(char in text for char in turkish_chars)
+    has_turkish_chars = TURKISH_CHARS_RE.search(text) is not None
     
     turkish_words = ['ve', 'bir', 'bu', 'için', 'ile', 'olan', 'nasıl', 'nedir', 'kullanım']
     english_words = ['the', 'and', 'or', 'how', 'what', 'with', 'from', 'that', 'this']
@@ -3,13 +3,28 @@ try:
 except ImportError:
     from typing_extensions import TypedDict
 
-from typing import List, Optional
+import asyncio
+import hashlib
+import re
+import weakref
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 from langgraph.graph import StateGraph, END
 from langchain_openai import ChatOpenAI
 from langchain_core.documents import Document
-from src.config import CHAT_MODEL, SYSTEM_PROMPT
+from langchain_core.runnables import RunnableLambda
+import numpy as np
+from src.config import (
+    CHAT_MODEL, SYSTEM_PROMPT, RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_THRESHOLD,
+    RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_ENTRIES, CONTEXT_DOC_MAX_CHARS,
+    RETRIEVAL_CACHE_ENABLED, RETRIEVAL_CACHE_THRESHOLD, RETRIEVAL_CACHE_TTL, RETRIEVAL_CACHE_MAX_ENTRIES
+)
+from src.context_compaction import compact_document
+from src.graph.response_cache import SemanticCache, SemanticResponseCache, embed_normalized_many
+from src.graph.request_coalescer import RequestCoalescer
+from src.multi_pattern import MultiPatternMatcher
 from src.retrievers.hybrid import HybridRetriever
-from src.retrievers.hybrid_graphrag import HybridGraphRAGRetriever
+from src.retrievers.hybrid_graphrag import HybridGraphRAGRetriever, HybridGraphRAGContext
 
 class BotState(TypedDict, total=False):
     query: str
@@ -17,48 +32,63 @@ class BotState(TypedDict, total=False):
     translated_query: str
     docs: List[Document]            # burada string tutacağız (uyum için)
     graph_context: Optional[dict]   # GraphRAG context
+    hybrid_context: Optional[HybridGraphRAGContext]  # Tam hibrit context (LLM formatlaması için)
     routing_info: Optional[dict]    # Query routing information
+    primary_url: Optional[str]      # İlk URL'li doküman (citation)
     citations: List[str]
     answer: Optional[str]
     retrieval_conf: float
-
-def detect_lang_and_passthrough(state: BotState) -> BotState:
-    q = state["query"].strip()
+    query_embedding: Optional[np.ndarray]      # translated_query'nin normalize embedding'i (response cache anahtarı)
+    retrieval_embedding: Optional[np.ndarray]  # Zenginleştirilmiş sorgunun embedding'i (retriever + retrieval cache)
+
+# Türkçe karakterler; q.lower() gerektirmemek için büyük harfler de dahil ("I"/"İ" lower() ile bu kümeye düşmez)
+_TR_CHARS_RE = re.compile("[çğıöşüÇĞÖŞÜ]")
+
+# Türkçe kelimeler (sadece belirgin Türkçe kelimeler)
+_TURKISH_WORDS = (
+    'nasıl', 'nedir', 'neden', 'hangi', 'için', 'yapılır', 'kullanım', 
+    'kurulum', 'ayar', 'sorun', 'hata', 'nerede', 'mi', 'mu', 'mı', 'mü'
+)
+
+# İngilizce kelimeler (güçlü İngilizce göstergeleri)
+_ENGLISH_WORDS = (
+    'how', 'what', 'where', 'when', 'why', 'which', 'the', 'and', 'or', 'is',
+    'are', 'can', 'will', 'should', 'would', 'could', 'setup', 'install',
+    'configuration', 'error', 'problem', 'issue', 'with', 'from', 'to'
+)
+
+# Kelime listeleri tek birer regex'te birleştirilir; \b sınırları boşluk/noktalama/baş-son durumlarını kapsar
+_TURKISH_WORDS_RE = re.compile(r"\b(?:%s)\b" % "|".join(map(re.escape, _TURKISH_WORDS)))
+_ENGLISH_WORDS_RE = re.compile(r"\b(?:%s)\b" % "|".join(map(re.escape, _ENGLISH_WORDS)))
+
+@lru_cache(maxsize=4096)
+def _detect_lang(q: str) -> str:
+    """Sorgunun dilini belirler (saf fonksiyon; tekrar eden sorgular önbellekten döner)"""
     q_lower = q.lower()
     
     # Türkçe karakterler kontrolü
-    has_turkish_chars = any(ch in "çğıöşü" for ch in q_lower)
+    has_turkish_chars = _TR_CHARS_RE.search(q) is not None
     
-    # Türkçe kelimeler kontrolü (sadece belirgin Türkçe kelimeler)
-    turkish_words = [
-        'nasıl', 'nedir', 'neden', 'hangi', 'için', 'yapılır', 'kullanım', 
-        'kurulum', 'ayar', 'sorun', 'hata', 'nerede', 'mi', 'mu', 'mı', 'mü'
-    ]
-    has_turkish_words = any(f' {word} ' in f' {q_lower} ' or q_lower.startswith(word) or q_lower.endswith(word) or
-                           q_lower.endswith(f' {word}?') or q_lower.endswith(f' {word}.')
-                           for word in turkish_words)
-    
-    # İngilizce kelimeler kontrolü (güçlü İngilizce göstergeleri)
-    english_words = [
-        'how', 'what', 'where', 'when', 'why', 'which', 'the', 'and', 'or', 'is',
-        'are', 'can', 'will', 'should', 'would', 'could', 'setup', 'install',
-        'configuration', 'error', 'problem', 'issue', 'with', 'from', 'to'
-    ]
-    has_english_words = any(f' {word} ' in f' {q_lower} ' or q_lower.startswith(word) or q_lower.endswith(word)
-                           for word in english_words)
+    # Türkçe kelimeler kontrolü
+    has_turkish_words = _TURKISH_WORDS_RE.search(q_lower) is not None
+    
+    # İngilizce kelimeler kontrolü
+    has_english_words = _ENGLISH_WORDS_RE.search(q_lower) is not None
     
     # Dil belirleme mantığı (öncelik sırası önemli)
     if has_turkish_chars:
-        lang = "Türkçe"
+        return "Türkçe"
     elif has_turkish_words and not has_english_words:
-        lang = "Türkçe"
+        return "Türkçe"
     elif has_english_words:
-        lang = "English"
+        return "English"
     else:
         # Varsayılan olarak İngilizce (teknik terimler için)
-        lang = "English"
-    
-    state.update({"lang": lang, "translated_query": q})
+        return "English"
+
+def detect_lang_and_passthrough(state: BotState) -> BotState:
+    q = state["query"].strip()
+    state.update({"lang": _detect_lang(q), "translated_query": q})
     return state
 
 def detect_conversational_intent(state: BotState) -> BotState:
@@ -68,241 +98,362 @@ def detect_conversational_intent(state: BotState) -> BotState:
     return state
 
 
+# Platform query expansion
+_TR_PLATFORM_KEYWORDS = ("platform", "destekl", "hangi", "platfor")
+_EN_PLATFORM_KEYWORDS = ("platform", "support", "which", "what platforms")
+_PLATFORM_TERMS = " ".join(("iOS", "Android", "React Native", "Unity", "Cordova", "Web", "Swift", "Kotlin"))
+
+# Türkçe → İngilizce terim eşlemesi (import sırasında bir kez oluşturulur)
+_TR_EN_MAPPING: Dict[str, str] = {
+    "nasıl": "how",
+    "nerede": "where",
+    "ne": "what",
+    "hangi": "which",
+    "kurulum": "setup installation",
+    "entegrasyon": "integration",
+    "platform": "platform iOS Android",
+    "bildirim": "notification push",
+    "segment": "segment user",
+    "kampanya": "campaign message",
+    "analitik": "analytics report",
+    "otomasyon": "automation journey",
+    "ayar": "settings configuration"
+}
+
+# Dil başına tek Aho-Corasick otomatı: Türkçe'de platform anahtar kelimeleri ve eşleme terimleri
+# aynı geçişte bulunur; çakışan/iç içe eşleşmeler de (örn. "nerede" içindeki "ne") raporlanır
+_TR_QUERY_MATCHER = MultiPatternMatcher((*_TR_PLATFORM_KEYWORDS, *_TR_EN_MAPPING))
+_EN_QUERY_MATCHER = MultiPatternMatcher(_EN_PLATFORM_KEYWORDS)
+
+
+@lru_cache(maxsize=2048)
 def preprocess_query(query: str, lang: str) -> str:
     """
     Enhanced query preprocessing with platform-specific expansion
+
+    Saf bir fonksiyon olduğu için sonuçlar (query, lang) anahtarıyla önbelleğe alınır.
     """
     enhanced_query = query
-    
-    # Platform query expansion
-    platform_keywords = {
-        "türkçe": ["platform", "destekl", "hangi", "platfor"],
-        "english": ["platform", "support", "which", "what platforms"]
-    }
-    
     query_lower = query.lower()
+    is_turkish = lang == "Türkçe"
+    
+    # Tek geçişte sorgudaki tüm bilinen terimler
+    hits = (_TR_QUERY_MATCHER if is_turkish else _EN_QUERY_MATCHER).find_all(query_lower)
     
     # Check if this is a platform-related query
-    is_platform_query = False
-    if lang == "Türkçe":
-        is_platform_query = any(keyword in query_lower for keyword in platform_keywords["türkçe"])
-    else:
-        is_platform_query = any(keyword in query_lower for keyword in platform_keywords["english"])
+    is_platform_query = not hits.isdisjoint(_TR_PLATFORM_KEYWORDS if is_turkish else _EN_PLATFORM_KEYWORDS)
     
     # Add platform-specific terms for better retrieval
     if is_platform_query:
-        platform_terms = ["iOS", "Android", "React Native", "Unity", "Cordova", "Web", "Swift", "Kotlin"]
-        enhanced_query += " " + " ".join(platform_terms)
+        enhanced_query += " " + _PLATFORM_TERMS
         print(f"🎯 Platform query detected, enhanced: {enhanced_query}")
     
     # Original enhancement logic
-    turkish_to_english = {
-        "nasıl": "how",
-        "nerede": "where", 
-        "ne": "what",
-        "hangi": "which",
-        "kurulum": "setup installation",
-        "entegrasyon": "integration",
-        "platform": "platform iOS Android",
-        "bildirim": "notification push",
-        "segment": "segment user",
-        "kampanya": "campaign message",
-        "analitik": "analytics report",
-        "otomasyon": "automation journey",
-        "ayar": "settings configuration"
-    }
-    
-    if lang == "Türkçe":
-        for tr_word, en_equivalent in turkish_to_english.items():
-            if tr_word in enhanced_query.lower():
-                enhanced_query += f" {en_equivalent}"
+    # İngilizce sorgular eşleme terimlerini hiç taramaz. Türkçe karakter kontrolüyle ayrıca kısa devre
+    # yapılmaz: "kurulum nasil" gibi ASCII yazılmış Türkçe sorgular da eşleşmelidir.
+    if is_turkish:
+        expansions = [en for tr, en in _TR_EN_MAPPING.items() if tr in hits]
+        if expansions:
+            enhanced_query += " " + " ".join(expansions)
     
     return enhanced_query
 
-def retrieve_node(retriever):
-    def _inner(state: BotState) -> BotState:
-        q = state["translated_query"]
-        lang = state["lang"]
+def _flat(vector: Optional[np.ndarray]) -> Optional[np.ndarray]:
+    """(1 x dim) normalize embedding → retriever'ların beklediği tek boyutlu vektör"""
+    return vector[0] if vector is not None else None
+
+class RetrieveNode:
+    """Retrieval node'u; retriever graph kurulumunda bir kez bağlanır"""
+    
+    def __init__(self, retriever, retrieval_cache: Optional[SemanticCache] = None, embeddings=None):
+        self.retriever = retriever
+        self.retrieval_cache = retrieval_cache
+        self.embeddings = embeddings if embeddings is not None else getattr(retrieval_cache, "embeddings", None)
+        # Retriever tipi graph kurulumunda belli; her istekte isinstance yerine uygun gövde bir kez seçilir
+        if isinstance(retriever, HybridGraphRAGRetriever):
+            self._retrieve = self._retrieve_graphrag
+        else:
+            self._retrieve = self._retrieve_legacy
+    
+    def _retrieve_graphrag(self, enhanced_q: str, vector: Optional[np.ndarray]
+                           ) -> Tuple[List[dict], float, Optional[HybridGraphRAGContext]]:
+        # Use new hybrid retrieval with GraphRAG
+        hybrid_context = self.retriever.retrieve(enhanced_q, k=10, query_vector=_flat(vector))
+        
+        # Vector context is already in legacy format; confidence comes from hybrid result
+        return hybrid_context.vector_context, hybrid_context.combined_confidence, hybrid_context
+    
+    def _retrieve_legacy(self, enhanced_q: str, vector: Optional[np.ndarray]
+                         ) -> Tuple[List[dict], float, Optional[HybridGraphRAGContext]]:
+        # Use legacy HybridRetriever
+        items = self.retriever.retrieve(enhanced_q, k=10, query_vector=_flat(vector))
         
+        # Better confidence calculation based on actual scores
+        # (HybridRetriever sonuçları skora göre azalan sırada döner; en yüksek skor ilk öğede)
+        max_score = items[0]["score"] if items else 0.0
+        # Normalize score to 0-1 range (scores can be > 1)
+        return items, min(max_score / 1.5, 1.0), None  # Lowered divisor for better confidence
+    
+    def _query_vector(self, state: BotState, enhanced_q: str) -> Optional[np.ndarray]:
+        """
+        Sorgu embedding'lerini tek embed_documents isteğinde hesaplar: zenginleştirilmiş sorgununki
+        retrieval cache ve retriever'ın FAISS araması için döner; translated_query'ninki generate
+        node'undaki response cache'in anahtarıdır (graph dışındaki çağrılarla aynı anahtar)
+        """
+        if "retrieval_embedding" not in state:
+            queries = list(dict.fromkeys((state["translated_query"], enhanced_q)))
+            try:
+                vectors = embed_normalized_many(self.embeddings, queries)
+                state["query_embedding"], state["retrieval_embedding"] = vectors[:1], vectors[-1:]
+            except Exception as e:
+                print(f"⚠️ Query embedding failed: {e}")
+                state["query_embedding"] = state["retrieval_embedding"] = None
+        return state["retrieval_embedding"]
+    
+    def __call__(self, state: BotState) -> BotState:
         # Preprocess query to add English terms
-        enhanced_q = preprocess_query(q, lang)
+        enhanced_q = preprocess_query(state["translated_query"], state["lang"])
+        vector = self._query_vector(state, enhanced_q) if self.embeddings is not None else None
         
-        # Check if we're using the new hybrid GraphRAG retriever
-        if isinstance(retriever, HybridGraphRAGRetriever):
-            # Use new hybrid retrieval with GraphRAG
-            hybrid_context = retriever.retrieve(enhanced_q, k=10)
-            
-            # Convert vector context to legacy format for compatibility
-            items = hybrid_context.vector_context
-            
-            # Store graph context and routing info
-            state["graph_context"] = hybrid_context.graph_context
-            state["routing_info"] = hybrid_context.routing_info
-            
-            # Calculate confidence from hybrid result
-            conf = hybrid_context.combined_confidence
-            
+        # Semantik olarak eşdeğer bir sorgunun sonucu (docs + graph context + routing) yeniden kullanılır
+        result = None
+        if self.retrieval_cache is not None and vector is not None:
+            result = self.retrieval_cache.get(vector, state["lang"])
+        if result is not None:
+            print("⚡ Retrieval cache hit")
         else:
-            # Use legacy HybridRetriever
-            items = retriever.retrieve(enhanced_q, k=10)
-            state["graph_context"] = None
-            state["routing_info"] = None
-            
-            # Better confidence calculation based on actual scores
-            if items:
-                max_score = max(item.get("score", 0) for item in items)
-                # Normalize score to 0-1 range (scores can be > 1)
-                conf = min(max_score / 1.5, 1.0)  # Lowered divisor for better confidence
-            else:
-                conf = 0.0
+            result = self._retrieve(enhanced_q, vector)
+            if self.retrieval_cache is not None and vector is not None:
+                self.retrieval_cache.put(vector, state["lang"], result)
         
+        items, conf, hybrid_context = result
+        state["hybrid_context"] = hybrid_context
+        state["graph_context"] = hybrid_context.graph_context if hybrid_context else None
+        state["routing_info"] = hybrid_context.routing_info if hybrid_context else None
         state["docs"] = items
+        # SADECE İLK URL (citation için; generate'te dokümanları tekrar taramamak için burada)
+        state["primary_url"] = next((url for d in items if (url := d.get("url"))), None)
         state["retrieval_conf"] = conf
         return state
-    return _inner
+    
+    async def acall(self, state: BotState) -> BotState:
+        # Retriever senkron (BM25/FAISS/graph); event loop'u bloklamamak için thread'de çalıştır
+        return await asyncio.to_thread(self, state)
 
 def decide_node(state: BotState) -> BotState:
     return state  # routing fonksiyonları ayrı
 
-def generate_answer_node(llm: ChatOpenAI):
-    def _inner(state: BotState) -> BotState:
-        lang = state["lang"]
-        q = state["translated_query"]
-        docs = state.get("docs", [])
-        graph_context = state.get("graph_context")
-        routing_info = state.get("routing_info", {})
-        
+# Prompt'lar sağlayıcının prefix cache'inden faydalanmak için "statik önce, dinamik sonra" düzenindedir:
+# sistem mesajı = SYSTEM_PROMPT + (dil, strateji) talimatları (sabit), kullanıcı mesajı = context + soru.
+# Her ikili (sistem prompt'u, kullanıcı mesajı şablonu) import sırasında bir kez oluşturulur.
+_TR_HYBRID_TAIL = "{ctx}\n\nSoru: {q}"
+_EN_HYBRID_TAIL = "{ctx}\n\nQuestion: {q}"
+
+# (Türkçe mi, strateji) → (sistem prompt'u, kullanıcı mesajı şablonu)
+_HYBRID_PROMPTS: Dict[tuple, Tuple[str, str]] = {
+    (True, "graph_first"): (SYSTEM_PROMPT + """
+Verilen hibrit context'i kullanarak TÜRKÇE kapsamlı bir cevap verin.
+🎯 ÖNCELİK: Knowledge graph insights'larını birincil kaynak olarak kullanın, documentation'ı destekleyici detaylar için kullanın.
+İlgili bileşenler, bağımlılıklar ve workflow'ları dahil edin.""", _TR_HYBRID_TAIL),
+    (True, "vector_first"): (SYSTEM_PROMPT + """
+Verilen hibrit context'i kullanarak TÜRKÇE kapsamlı bir cevap verin.
+🎯 ÖNCELİK: Documentation'ı birincil kaynak olarak kullanın, graph insights'ları ilişkiler ve context için kullanın.
+Gerekirse adımlar halinde açıklayın.""", _TR_HYBRID_TAIL),
+    (True, "balanced_hybrid"): (SYSTEM_PROMPT + """
+Verilen hibrit context'i kullanarak TÜRKÇE kapsamlı bir cevap verin.
+🎯 DENGELI: Hem knowledge graph hem documentation bilgilerini eşit şekilde entegre edin.
+İlişkiler, bağımlılıklar ve detaylı açıklamaları birlikte sunun.""", _TR_HYBRID_TAIL),
+    (False, "graph_first"): (SYSTEM_PROMPT + """
+Answer in ENGLISH using the provided hybrid context comprehensively.
+🎯 PRIORITY: Use knowledge graph insights as primary source, documentation for supporting details.
+Include related components, dependencies, and workflows.""", _EN_HYBRID_TAIL),
+    (False, "vector_first"): (SYSTEM_PROMPT + """
+Answer in ENGLISH using the provided hybrid context comprehensively.
+🎯 PRIORITY: Use documentation as primary source, graph insights for relationships and context.
+Use steps if needed.""", _EN_HYBRID_TAIL),
+    (False, "balanced_hybrid"): (SYSTEM_PROMPT + """
+Answer in ENGLISH using the provided hybrid context comprehensively.
+🎯 BALANCED: Integrate both knowledge graph and documentation information equally.
+Present relationships, dependencies, and detailed explanations together.""", _EN_HYBRID_TAIL),
+}
+
+# (Türkçe mi, route_type == "graph" mi) → (sistem prompt'u, kullanıcı mesajı şablonu)
+_ROUTE_PROMPTS: Dict[tuple, Tuple[str, str]] = {
+    (True, True): (SYSTEM_PROMPT + """
+Verilen kaynak bilgileri ve kavram haritasındaki ilişkileri kullanarak TÜRKÇE kapsamlı bir cevap verin. İlgili bileşenler ve bağımlılıkları da dahil edin.""",
+                   "Kaynak Bilgiler:\n{ctx}\n\nSoru: {q}"),
+    (True, False): (SYSTEM_PROMPT + """
+Verilen belgeleri kullanarak TÜRKÇE cevap verin. Gerekirse adımlar halinde açıklayın.""",
+                    "Belgeler:\n{ctx}\n\nSoru: {q}"),
+    (False, True): (SYSTEM_PROMPT + """
+Answer in ENGLISH using the provided source information and knowledge graph relationships. Include related components and dependencies.""",
+                    "Source Information:\n{ctx}\n\nQuestion: {q}"),
+    (False, False): (SYSTEM_PROMPT + """
+Answer in ENGLISH using the provided documentation. Use steps if needed.""",
+                     "Documentation:\n{ctx}\n\nQuestion: {q}"),
+}
+
+# Türkçe mi → klasik context'teki kavram haritası başlığı
+_GRAPH_CONTEXT_HEADERS = {True: "=== KAVRAM HARİTASI ===", False: "=== KNOWLEDGE GRAPH ==="}
+
+class GenerateAnswerNode:
+    """Cevap üretme node'u; LLM istemcisi ve retriever graph kurulumunda bir kez bağlanır"""
+    
+    def __init__(self, llm: ChatOpenAI, retriever=None, response_cache: Optional[SemanticResponseCache] = None,
+                 coalescer: Optional[RequestCoalescer] = None):
+        self.llm = llm
+        self.retriever = retriever
+        self.response_cache = response_cache
+        # Aynı anda gelen özdeş prompt'lar tek LLM isteğini paylaşır
+        self.coalescer = coalescer if coalescer is not None else RequestCoalescer()
+        # Hibrit context formatlayıcısı retriever tipine bağlı; her istekte yoklamak yerine prompt kurucusunu bir kez seç
+        if isinstance(retriever, HybridGraphRAGRetriever):
+            self._build_messages = self._build_hybrid_messages
+        else:
+            self._build_messages = self._build_classic_messages
+    
+    def _format_contexts(self, is_turkish: bool, q: str, docs: List[dict], graph_context: Optional[dict]) -> str:
+        """Graph ve doküman context'ini klasik prompt formatında birleştirir"""
         # Enhanced context formatting with GraphRAG integration
         formatted_contexts = []
         
         # Add graph context if available
-        if graph_context and graph_context.get("subgraph_info"):
-            if lang == "Türkçe":
-                formatted_contexts.append(f"=== KAVRAM HARİTASI ===\n{graph_context['subgraph_info']}\n")
-            else:
-                formatted_contexts.append(f"=== KNOWLEDGE GRAPH ===\n{graph_context['subgraph_info']}\n")
+        subgraph_info = graph_context.get("subgraph_info") if graph_context else None
+        if subgraph_info:
+            formatted_contexts.append(f"{_GRAPH_CONTEXT_HEADERS[is_turkish]}\n{subgraph_info}\n")
         
-        # Add traditional document context
-        for i, doc in enumerate(docs[:3], 1):  # Limit to top 3 most relevant
-            text = doc.get("text", "")
-            source = doc.get("url", "unknown")
-            
-            # Basic text cleanup
-            text = text.strip()
-            
-            formatted_contexts.append(f"=== KAYNAK {i} ===\n{text}\n(URL: {source})\n")
+        # Add traditional document context (top 3 most relevant, compacted to the query-relevant passage)
+        formatted_contexts.extend(
+            f"=== KAYNAK {i} ===\n{compact_document(doc.get('text', ''), q, CONTEXT_DOC_MAX_CHARS)}\n"
+            f"(URL: {doc.get('url', 'unknown')})\n"
+            for i, doc in enumerate(docs[:3], 1)
+        )
         
-        ctx = "\n".join(formatted_contexts)
-        sys = SYSTEM_PROMPT
+        return "\n".join(formatted_contexts)
+    
+    def _build_classic_messages(self, state: BotState) -> List[dict]:
+        """Klasik route prompt'ları + doküman/graph context'i"""
+        lang = state["lang"]
+        q = state["translated_query"]
+        docs = state.get("docs", [])
+        graph_context = state.get("graph_context")
+        routing_info = state.get("routing_info", {})
         
-        # Enhanced prompting for hybrid context merging
         # Handle case when routing_info is None (GraphRAG disabled)
-        if routing_info is not None:
-            route_type = routing_info.get('route_type', 'vector')
-            strategy = routing_info.get('strategy', 'balanced_hybrid')
-        else:
-            route_type = 'vector'
-            strategy = 'traditional_hybrid'
+        route_type = routing_info.get('route_type', 'vector') if routing_info is not None else 'vector'
         
-        # Check if we have hybrid GraphRAG context
-        if graph_context and hasattr(state.get("retriever"), "format_context_for_llm"):
-            # Use enhanced formatting from HybridGraphRAGRetriever
-            ctx = state["retriever"].format_context_for_llm(graph_context, q)
-            
-            if lang == "Türkçe":
-                if strategy == "graph_first":
-                    prompt = f"""Soru: {q}
-
-{ctx}
-
-Bu hibrit context'i kullanarak TÜRKÇE kapsamlı bir cevap verin. 
-🎯 ÖNCELİK: Knowledge graph insights'larını birincil kaynak olarak kullanın, documentation'ı destekleyici detaylar için kullanın.
-İlgili bileşenler, bağımlılıklar ve workflow'ları dahil edin."""
-                elif strategy == "vector_first":
-                    prompt = f"""Soru: {q}
-
-{ctx}
+        is_turkish = lang == "Türkçe"
+        ctx = self._format_contexts(is_turkish, q, docs, graph_context)
+        sys, template = _ROUTE_PROMPTS[(is_turkish, route_type == "graph")]
+        prompt = template.format(q=q, ctx=ctx)
 
-Bu hibrit context'i kullanarak TÜRKÇE kapsamlı bir cevap verin.
-🎯 ÖNCELİK: Documentation'ı birincil kaynak olarak kullanın, graph insights'ları ilişkiler ve context için kullanın.
-Gerekirse adımlar halinde açıklayın."""
-                else:  # balanced_hybrid
-                    prompt = f"""Soru: {q}
-
-{ctx}
-
-Bu hibrit context'i kullanarak TÜRKÇE kapsamlı bir cevap verin.
-🎯 DENGELI: Hem knowledge graph hem documentation bilgilerini eşit şekilde entegre edin.
-İlişkiler, bağımlılıklar ve detaylı açıklamaları birlikte sunun."""
-            else:
-                if strategy == "graph_first":
-                    prompt = f"""Question: {q}
-
-{ctx}
-
-Answer in ENGLISH using this hybrid context comprehensively.
-🎯 PRIORITY: Use knowledge graph insights as primary source, documentation for supporting details.
-Include related components, dependencies, and workflows."""
-                elif strategy == "vector_first":
-                    prompt = f"""Question: {q}
-
-{ctx}
-
-Answer in ENGLISH using this hybrid context comprehensively.
-🎯 PRIORITY: Use documentation as primary source, graph insights for relationships and context.
-Use steps if needed."""
-                else:  # balanced_hybrid
-                    prompt = f"""Question: {q}
-
-{ctx}
-
-Answer in ENGLISH using this hybrid context comprehensively.
-🎯 BALANCED: Integrate both knowledge graph and documentation information equally.
-Present relationships, dependencies, and detailed explanations together."""
-        else:
+        return [{"role":"system","content":sys},{"role":"user","content":prompt}]
+    
+    def _build_hybrid_messages(self, state: BotState) -> List[dict]:
+        """HybridGraphRAGRetriever formatlaması + strateji prompt'ları (graph context yoksa klasik)"""
+        graph_context = state.get("graph_context")
+        hybrid_context = state.get("hybrid_context")
+        if not graph_context or hybrid_context is None:
             # Fallback to traditional routing for non-GraphRAG contexts
-            if lang == "Türkçe":
-                if route_type == "graph":
-                    prompt = f"""Soru: {q}
-
-Kaynak Bilgiler:
-{ctx}
-
-Yukarıdaki bilgileri ve kavram haritasındaki ilişkileri kullanarak TÜRKÇE kapsamlı bir cevap verin. İlgili bileşenler ve bağımlılıkları da dahil edin."""
-                else:
-                    prompt = f"""Soru: {q}
-
-Belgeler:
-{ctx}
-
-Yukarıdaki belgeleri kullanarak TÜRKÇE cevap verin. Gerekirse adımlar halinde açıklayın."""
-            else:
-                if route_type == "graph":
-                    prompt = f"""Question: {q}
-
-Source Information:
-{ctx}
-
-Answer in ENGLISH using the above information and knowledge graph relationships. Include related components and dependencies."""
-                else:
-                    prompt = f"""Question: {q}
-
-Documentation:
-{ctx}
-
-Answer in ENGLISH using the documentation above. Use steps if needed."""
-
-        out = llm.invoke([{"role":"system","content":sys},{"role":"user","content":prompt}]).content
+            return self._build_classic_messages(state)
+        
+        lang = state["lang"]
+        q = state["translated_query"]
+        routing_info = state.get("routing_info", {})
+        strategy = routing_info.get('strategy', 'balanced_hybrid') if routing_info is not None else 'traditional_hybrid'
         
+        # Use enhanced formatting from HybridGraphRAGRetriever
+        is_turkish = lang == "Türkçe"
+        ctx = self.retriever.format_context_for_llm(hybrid_context, q)
+        # Router RetrievalStrategy enum'u döndürür; şablon anahtarları string
+        strategy = getattr(strategy, "value", strategy)
+        prompts = _HYBRID_PROMPTS.get((is_turkish, strategy))
+        sys, template = prompts if prompts is not None else _HYBRID_PROMPTS[(is_turkish, "balanced_hybrid")]
+        prompt = template.format(q=q, ctx=ctx)
+
+        return [{"role":"system","content":sys},{"role":"user","content":prompt}]
+    
+    def _finish(self, state: BotState, out: str) -> BotState:
         # Post-process the answer
-        out = post_process_answer(out, lang)
+        out = post_process_answer(out, state["lang"])
 
-        # SADECE İLK URL
-        primary = next((d.get("url") for d in docs if d.get("url")), None)
+        # SADECE İLK URL (retrieve node'unda belirlenir)
+        primary = state.get("primary_url")
         state["citations"] = [primary] if primary else []
         state["answer"] = out
         return state
-    return _inner
+    
+    def embed_query(self, query: str) -> Optional[np.ndarray]:
+        """Response cache anahtarı olan sorgu embedding'i (cache kapalıysa/hata olursa None)"""
+        if self.response_cache is None:
+            return None
+        
+        try:
+            return self.response_cache.embed(query)
+        except Exception as e:
+            print(f"⚠️ Response cache embedding failed: {e}")
+            return None
+    
+    def _cache_lookup(self, state: BotState) -> Tuple[bool, Optional[np.ndarray]]:
+        """Semantik cache'e bakar; (hit, sorgu embedding'i) döndürür, hit'te cevabı state'e yazar"""
+        if self.response_cache is None:
+            return False, None
+        
+        # Graph akışında translated_query embedding'i retrieve node'unda hesaplanıp state'e yazılır
+        if "query_embedding" in state:
+            vector = state["query_embedding"]
+        else:
+            vector = self.embed_query(state["translated_query"])
+        if vector is None:
+            return False, None
+        
+        cached = self.response_cache.get(vector, state["lang"])
+        if cached is None:
+            return False, vector
+        
+        print("⚡ Response cache hit")
+        state["answer"] = cached.answer
+        state["citations"] = list(cached.citations)
+        return True, vector
+    
+    def _cache_store(self, state: BotState, vector: Optional[np.ndarray]):
+        if vector is not None:
+            self.response_cache.put(vector, state["lang"], state["answer"], state["citations"])
+    
+    # Yanıt token token stream edilir; graph.stream(stream_mode="messages") tüketicileri
+    # ilk token'ı tüm cevabın tamamlanmasını beklemeden alır
+    def __call__(self, state: BotState) -> BotState:
+        hit, vector = self._cache_lookup(state)
+        if hit:
+            return state
+        
+        messages = self._build_messages(state)
+        out, coalesced = self.coalescer.run(
+            RequestCoalescer.make_key(self.llm.model_name, messages=messages),
+            lambda: "".join(chunk.content for chunk in self.llm.stream(messages)),
+        )
+        state = self._finish(state, out)
+        if not coalesced:  # Cache'e isteği gerçekten yapan çağrı yazar
+            self._cache_store(state, vector)
+        return state
+    
+    async def acall(self, state: BotState) -> BotState:
+        hit, vector = await asyncio.to_thread(self._cache_lookup, state)
+        if hit:
+            return state
+        
+        # graph.ainvoke altında LLM isteği event loop'u bloklamadan beklenir
+        async def _generate() -> str:
+            return "".join([chunk.content async for chunk in self.llm.astream(messages)])
+        
+        messages = self._build_messages(state)
+        out, coalesced = await self.coalescer.arun(
+            RequestCoalescer.make_key(self.llm.model_name, messages=messages), _generate
+        )
+        state = self._finish(state, out)
+        if not coalesced:
+            self._cache_store(state, vector)
+        return state
 
 # 🔧 REMOVED: is_procedural_question function - was causing accuracy issues
 
@@ -312,6 +463,43 @@ def post_process_answer(answer: str, lang: str) -> str:
     # Just clean up and return - no emoji additions
     return answer.strip()
 
+# Tek kelimelik belirsiz sorular -> Türkçe mi; retrieval/LLM'e gitmeden hazır yanıtla cevaplanır
+# ("NASIL".lower() == "nasil" olduğundan ASCII yazımlar da dahil)
+_CANNED_QUERIES = {
+    "help": False, "how": False,
+    "yardım": True, "nasıl": True, "yardim": True, "nasil": True,
+}
+
+_CANNED_REPLIES = {
+    True: (
+        "Size daha iyi yardımcı olabilmem için sorunuzu biraz detaylandırır mısınız? "
+        "Örneğin hangi platformu (iOS/Android/Web/React Native), hangi özelliği "
+        "(push bildirim, segment, kampanya) kullandığınızı veya hangi hata mesajını gördüğünüzü yazabilirsiniz."
+    ),
+    False: (
+        "Could you add a bit more detail so I can help? For example, tell me which platform "
+        "(iOS/Android/Web/React Native) or feature (push notifications, segments, campaigns) "
+        "you are working with, or which error message you see."
+    ),
+}
+
+def _canned_key(query: str) -> str:
+    return query.strip().rstrip("?!.").lower()
+
+def canned_reply_node(state: BotState) -> BotState:
+    """Belirsiz tek kelimelik sorular için LLM çağrısı olmadan hazır yanıt"""
+    state = detect_lang_and_passthrough(state)
+    is_turkish = _CANNED_QUERIES[_canned_key(state["query"])]
+    state["lang"] = "Türkçe" if is_turkish else "English"
+    state["answer"] = _CANNED_REPLIES[is_turkish]
+    state["citations"] = []
+    state["retrieval_conf"] = 0.0
+    return state
+
+def route_entry(state: BotState) -> str:
+    """Hazır yanıtı olan sorular retrieval'a hiç girmez"""
+    return "canned" if _canned_key(state["query"]) in _CANNED_QUERIES else "retrieve"
+
 def needs_clarification_check(state: BotState) -> BotState:
     """Sorunun açıklayıcı soru gerekip gerekmediğini kontrol et (SIMPLIFIED)"""
     query = state["translated_query"].lower()
@@ -319,7 +507,7 @@ def needs_clarification_check(state: BotState) -> BotState:
     # Sadece çok belirsiz sorular için clarification iste
     very_ambiguous = [
         len(query.split()) < 3,  # Çok kısa sorular
-        query in ["help", "yardım", "nasıl", "how"]  # Tek kelime sorular
+        query in _CANNED_QUERIES  # Tek kelime sorular
     ]
     
     state["needs_clarification"] = any(very_ambiguous)
@@ -364,10 +552,10 @@ Generate a short and clear clarifying question:
 """
         
         # LLM'den açıklayıcı soru al
-        response = llm.invoke([
+        response = "".join(chunk.content for chunk in llm.stream([
             {"role": "system", "content": "Sen yardımcı bir asistansın. Kullanıcıya açıklayıcı sorular sorarak daha iyi yardım ediyorsun."},
             {"role": "user", "content": clarify_prompt}
-        ]).content.strip()
+        ])).strip()
         
         state["clarifying_question"] = response
         state["answer"] = response  # UI için
@@ -386,8 +574,30 @@ def route_after_retrieve(state: BotState) -> str:
 
 # route_after_clarification_check fonksiyonu kaldırıldı - artık kullanılmıyor
 
-def build_app_graph(corpus_texts, corpus_meta, use_graphrag=True):
-    llm = ChatOpenAI(model=CHAT_MODEL, temperature=0)
+# Retriever kurulumu (BM25 + FAISS + knowledge graph) en pahalı adım; aynı korpus için yeniden kullan
+_RETRIEVER_CACHE: Dict[tuple, object] = {}
+_RETRIEVER_CACHE_SIZE = 4
+
+def _corpus_fingerprint(corpus_texts, corpus_meta) -> str:
+    """Metinler ve retriever'ların kullandığı metadata (source/url) üzerinden korpus özeti"""
+    digest = hashlib.blake2b(digest_size=16)
+    for text, meta in zip(corpus_texts, corpus_meta):
+        for field in (text, meta.get("source", ""), meta.get("url") or ""):
+            digest.update(field.encode("utf-8"))
+            digest.update(b"\0")
+    digest.update(str(len(corpus_meta)).encode())
+    return digest.hexdigest()
+
+def _get_retriever(corpus_texts, corpus_meta, use_graphrag: bool, corpus_version: Optional[str] = None):
+    """Aynı korpus ve mod için daha önce kurulmuş retriever'ı döndürür"""
+    # İçerik bazlı anahtar: Streamlit her rerun'da yeni liste oluştursa da cache isabet eder.
+    # Korpusu tanımlayan bir sürüm verilirse korpus hiç taranmaz.
+    if corpus_version is None:
+        corpus_version = _corpus_fingerprint(corpus_texts, corpus_meta)
+    key = (use_graphrag, corpus_version)
+    retriever = _RETRIEVER_CACHE.get(key)
+    if retriever is not None:
+        return retriever
     
     # Choose retriever based on flag
     if use_graphrag:
@@ -396,19 +606,86 @@ def build_app_graph(corpus_texts, corpus_meta, use_graphrag=True):
     else:
         retriever = HybridRetriever(corpus_texts, corpus_meta)
         print("📊 Traditional hybrid retriever initialized")
-
+    
+    # En eski girdiyi at (dict ekleme sırasını korur)
+    if len(_RETRIEVER_CACHE) >= _RETRIEVER_CACHE_SIZE:
+        _RETRIEVER_CACHE.pop(next(iter(_RETRIEVER_CACHE)))
+    _RETRIEVER_CACHE[key] = retriever
+    return retriever
+
+# Retriever başına bir response/retrieval cache (sonuçlar korpusa bağlı); retriever cache'ten düşünce onlar da düşer
+_RESPONSE_CACHES: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_RETRIEVAL_CACHES: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+# Graph'lar arasında paylaşılan in-flight LLM istek tablosu (anahtar model + mesajlar)
+_LLM_COALESCER = RequestCoalescer()
+
+def _get_response_cache(retriever, llm: ChatOpenAI) -> Optional[SemanticResponseCache]:
+    """Deterministik LLM için retriever'a bağlı semantik response cache'i döndürür"""
+    if not RESPONSE_CACHE_ENABLED or llm.temperature != 0:
+        return None
+    
+    cache = _RESPONSE_CACHES.get(retriever)
+    if cache is None:
+        cache = SemanticResponseCache(
+            _retriever_embeddings(retriever),
+            threshold=RESPONSE_CACHE_THRESHOLD,
+            ttl_seconds=RESPONSE_CACHE_TTL,
+            max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+        )
+        _RESPONSE_CACHES[retriever] = cache
+    return cache
+
+def _get_retrieval_cache(retriever) -> Optional[SemanticCache]:
+    """Retriever'a bağlı semantik retrieval cache'i döndürür"""
+    if not RETRIEVAL_CACHE_ENABLED:
+        return None
+    
+    cache = _RETRIEVAL_CACHES.get(retriever)
+    if cache is None:
+        cache = SemanticCache(
+            _retriever_embeddings(retriever),
+            threshold=RETRIEVAL_CACHE_THRESHOLD,
+            ttl_seconds=RETRIEVAL_CACHE_TTL,
+            max_entries=RETRIEVAL_CACHE_MAX_ENTRIES,
+        )
+        _RETRIEVAL_CACHES[retriever] = cache
+    return cache
+
+def _retriever_embeddings(retriever):
+    """Retriever'ın OpenAIEmbeddings istemcisi; iki cache aynı embedding uzayını paylaşır"""
+    return getattr(retriever, "vector_retriever", retriever).emb
+
+@lru_cache(maxsize=1)
+def _get_llm() -> ChatOpenAI:
+    """Paylaşılan ChatOpenAI istemcisi (durumsuz, tekrar kullanılabilir)"""
+    return ChatOpenAI(model=CHAT_MODEL, temperature=0)
+
+def build_app_graph(corpus_texts, corpus_meta, use_graphrag=True, corpus_version: Optional[str] = None):
+    llm = _get_llm()
+    retriever = _get_retriever(corpus_texts, corpus_meta, use_graphrag, corpus_version)
+
+    retrieve = RetrieveNode(retriever, _get_retrieval_cache(retriever), _retriever_embeddings(retriever))
+    generate = GenerateAnswerNode(llm, retriever, _get_response_cache(retriever, llm), _LLM_COALESCER)
+    
+    # Retrieval yolunda akış dallanmadığı için detect → retrieve ve generate → finalize aynı node'larda
+    # çalışır; her kenar geçişindeki state birleştirme/dispatch maliyeti ortadan kalkar.
+    # Tek dal girişte: hazır yanıtlı belirsiz sorular retrieval ve LLM'i tamamen atlar.
+    def _detect_and_retrieve(state: BotState) -> BotState:
+        return retrieve(detect_lang_and_passthrough(state))
+    
+    # Sorgu embedding'leri retrieve node'unda tek istekte hesaplanır (retriever + retrieval/response cache)
+    async def _adetect_and_retrieve(state: BotState) -> BotState:
+        return await retrieve.acall(detect_lang_and_passthrough(state))
+    
     g = StateGraph(BotState)
+    g.add_node("retrieve", RunnableLambda(_detect_and_retrieve, afunc=_adetect_and_retrieve))
+    g.add_node("generate", RunnableLambda(generate, afunc=generate.acall))  # finalize_node no-op
+    g.add_node("canned", canned_reply_node)
     
-    # Node'ları ekle (clarification node'ları kaldırıldı)
-    g.add_node("detect", detect_lang_and_passthrough)
-    g.add_node("retrieve", retrieve_node(retriever))
-    g.add_node("generate", generate_answer_node(llm))
-    g.add_node("finalize", finalize_node)
-
-    # Basitleştirilmiş graph flow - clarification kaldırıldı
-    g.set_entry_point("detect")
-    g.add_edge("detect", "retrieve")
-    g.add_edge("retrieve", "generate")  # Direkt generate'e git
-    g.add_edge("generate", "finalize")
+    g.set_conditional_entry_point(route_entry, {"canned": "canned", "retrieve": "retrieve"})
+    g.add_edge("retrieve", "generate")
+    g.add_edge("generate", END)
+    g.add_edge("canned", END)
 
     return g.compile()
\ No newline at end of file
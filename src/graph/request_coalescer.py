@@ -0,0 +1,112 @@
+"""
+In-flight request coalescing for identical LLM calls
+"""
+
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Iterable, Tuple
+
+# Lider çağrı iptal edildi/kesildi: bekleyenler sonucu alamaz, biri yeni lider olarak tekrar dener
+_RETRY = object()
+
+class RequestCoalescer:
+    """
+    Lets concurrent identical requests share a single outstanding call.
+
+    The first caller for a key runs the call; callers arriving with the same
+    key while it is in flight wait for its result (or exception) instead of
+    issuing their own. Sync and async callers share the same in-flight table.
+    A cancellation is never shared: an async leader's call runs as its own task
+    and finishes even if the leader is cancelled, and if the call itself is
+    cancelled (or interrupted) the waiters retry instead of receiving it.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(*parts: Any, messages: Iterable[dict] = ()) -> str:
+        """Stable digest of the request parts and chat messages"""
+        digest = hashlib.blake2b(digest_size=16)
+        for part in parts:
+            digest.update(str(part).encode("utf-8"))
+            digest.update(b"\x00")
+        for message in messages:
+            digest.update(message["role"].encode("utf-8"))
+            digest.update(b"\x00")
+            digest.update(message["content"].encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        """Return (future, is_leader) for key"""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future, False
+            future = self._inflight[key] = Future()
+            return future, True
+
+    def _settle(self, key: str, future: Future, result: Any = None, error: BaseException = None):
+        with self._lock:
+            self._inflight.pop(key, None)
+        if error is None:
+            future.set_result(result)
+        elif isinstance(error, Exception):
+            future.set_exception(error)
+        else:
+            future.set_result(_RETRY)  # CancelledError / KeyboardInterrupt başka isteklere taşınmaz
+
+    def _settle_task(self, key: str, future: Future, task: "asyncio.Task"):
+        """Done callback of an async leader's call task"""
+        if task.cancelled():
+            self._settle(key, future, error=asyncio.CancelledError())
+        elif task.exception() is not None:
+            self._settle(key, future, error=task.exception())
+        else:
+            self._settle(key, future, task.result())
+
+    def run(self, key: str, call: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run call once per in-flight key; returns (result, coalesced)"""
+        while True:
+            future, leader = self._join(key)
+            if leader:
+                break
+            result = future.result()
+            if result is not _RETRY:
+                return result, True
+
+        try:
+            result = call()
+        except BaseException as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, result)
+        return result, False
+
+    async def arun(self, key: str, call: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Async variant of run; waiting callers do not block the event loop"""
+        while True:
+            future, leader = self._join(key)
+            if leader:
+                break
+            # shield: bekleyen çağrı iptal edilirse paylaşılan future iptal edilmesin
+            result = await asyncio.shield(asyncio.wrap_future(future))
+            if result is not _RETRY:
+                return result, True
+
+        # Çağrı ayrı task'ta: lider iptal edilse de (ör. stream istemcisi koptu) tamamlanıp
+        # bekleyenlere sonucu verir; lider yalnızca kendi beklemesini bırakır
+        try:
+            task = asyncio.ensure_future(call())
+        except BaseException as e:
+            self._settle(key, future, error=e)
+            raise
+        task.add_done_callback(lambda done: self._settle_task(key, future, done))
+        return await asyncio.shield(task), False
+
+    def __len__(self) -> int:
+        return len(self._inflight)
@@ -0,0 +1,128 @@
+"""
+Embedding-keyed semantic caches for the answer generation and retrieval nodes
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+def embed_normalized(embeddings, query: str) -> np.ndarray:
+    """Embed and L2-normalize a query (shape: 1 x dim)"""
+    vector = np.asarray([embeddings.embed_query(query)], dtype="float32")
+    faiss.normalize_L2(vector)
+    return vector
+
+def embed_normalized_many(embeddings, queries: List[str]) -> np.ndarray:
+    """Embed queries in one embed_documents call and L2-normalize them (shape: n x dim)"""
+    vectors = np.asarray(embeddings.embed_documents(queries), dtype="float32")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+@dataclass
+class CachedResponse:
+    """Cached LLM answer with the citations it was produced with"""
+    answer: str
+    citations: List[str]
+    lang: str
+    created_at: float
+
+@dataclass
+class _CacheEntry:
+    value: Any
+    scope: str
+    created_at: float
+
+class SemanticCache:
+    """
+    Caches values keyed by L2-normalized query embeddings.
+
+    Lookups use a FAISS inner-product index, so cosine similarity >= threshold
+    between two queries counts as a hit; entries only match within the same
+    scope (e.g. language). Entries expire after ttl_seconds and the least
+    recently used entry is evicted once max_entries is exceeded.
+    """
+
+    def __init__(self, embeddings, threshold: float = 0.95, ttl_seconds: float = 300,
+                 max_entries: int = 1000):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self._index = None  # Embedding boyutu ilk sorguda belli olur
+        self._entries: "OrderedDict[int, _CacheEntry]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def embed(self, query: str) -> np.ndarray:
+        """Embed and L2-normalize a query (shape: 1 x dim)"""
+        return embed_normalized(self.embeddings, query)
+
+    def get(self, vector: np.ndarray, scope: str) -> Optional[Any]:
+        """Return the value of the most similar live entry above threshold, if any"""
+        with self._lock:
+            if self._index is None or self._index.ntotal == 0:
+                return None
+
+            k = min(self._index.ntotal, 4)
+            sims, ids = self._index.search(vector, k)
+            now = time.time()
+
+            for sim, entry_id in zip(sims[0], ids[0]):
+                if entry_id < 0 or sim < self.threshold:
+                    break  # Sonuçlar benzerliğe göre azalan sırada
+                entry = self._entries.get(int(entry_id))
+                if entry is None:
+                    continue
+                if now - entry.created_at > self.ttl_seconds:
+                    self._evict(int(entry_id))
+                    continue
+                if entry.scope != scope:
+                    continue
+
+                self._entries.move_to_end(int(entry_id))
+                return entry.value
+
+        return None
+
+    def put(self, vector: np.ndarray, scope: str, value: Any):
+        """Store a value for the given query embedding"""
+        with self._lock:
+            if self._index is None:
+                self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(vector.shape[1]))
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(vector, np.asarray([entry_id], dtype="int64"))
+            self._entries[entry_id] = _CacheEntry(value, scope, time.time())
+
+            while len(self._entries) > self.max_entries:
+                self._evict(next(iter(self._entries)))
+
+    def _evict(self, entry_id: int):
+        """Remove an entry from both the index and the entry table (lock held)"""
+        self._entries.pop(entry_id, None)
+        self._index.remove_ids(np.asarray([entry_id], dtype="int64"))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class SemanticResponseCache(SemanticCache):
+    """
+    Semantic cache of generated answers, scoped by answer language.
+    Only valid for deterministic (temperature=0) generation.
+    """
+
+    def get(self, vector: np.ndarray, lang: str) -> Optional[CachedResponse]:
+        return super().get(vector, lang)
+
+    def put(self, vector: np.ndarray, lang: str, answer: str, citations: List[str]):
+        super().put(vector, lang, CachedResponse(answer, list(citations), lang, time.time()))
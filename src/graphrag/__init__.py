@@ -6,11 +6,12 @@ Pure NetworkX implementation compatible with Python 3.13
 from .graph_store import NetmeraGraphStore
 from .graph_retriever import GraphRAGRetriever
 from .entity_extractor import EntityExtractor
-from .query_router import QueryRouter
+from .query_router import QueryRouter, get_router
 
 __all__ = [
     "NetmeraGraphStore", 
     "GraphRAGRetriever", 
     "EntityExtractor", 
-    "QueryRouter"
+    "QueryRouter",
+    "get_router"
 ]
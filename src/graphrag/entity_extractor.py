@@ -5,12 +5,15 @@ Pure regex-based implementation (no spaCy dependency required)
 
 import re
 import logging
+from bisect import bisect_left
 from typing import List, Dict, Set, Tuple
 from dataclasses import dataclass
 
+from ..multi_pattern import MultiPatternMatcher
+
 logger = logging.getLogger(__name__)
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ExtractedEntity:
     """Extracted entity from text"""
     text: str
@@ -103,12 +106,22 @@ class EntityExtractor:
             ]
         }
         
-        # Compile regex patterns
-        self.compiled_patterns = {}
-        for entity_type, patterns in self.entity_patterns.items():
-            self.compiled_patterns[entity_type] = [
-                re.compile(pattern, re.IGNORECASE) for pattern in patterns
-            ]
+        # Compile all patterns into a single alternation with one named group per pattern.
+        # Tüm pattern'ler \b ile başladığı için alternation sadece kelime başlarında denenir;
+        # örtüşen pattern eşleşmelerinden en soldaki kazanır
+        self.pattern_types = [
+            entity_type
+            for entity_type, patterns in self.entity_patterns.items()
+            for _ in patterns
+        ]
+        # Pattern'ler küçük harfe çevrilip küçük harfli metne uygulanır (IGNORECASE gerekmez)
+        self.mega_pattern = re.compile(
+            r"\b(?=[a-z/])(?:%s)" % "|".join(
+                f"(?P<{entity_type}_{i}>{pattern.lower()})"
+                for entity_type, patterns in self.entity_patterns.items()
+                for i, pattern in enumerate(patterns)
+            )
+        )
         
         # Netmera-specific terms that are always entities
         self.netmera_terms = {
@@ -131,46 +144,70 @@ class EntityExtractor:
                 'Mobile App', 'Native App', 'Hybrid App'
             ]
         }
+        
+        # Single automaton over all lowercased known terms -> (order, entity_type, term)
+        self.term_info = {}
+        for entity_type, terms in self.netmera_terms.items():
+            for term in terms:
+                self.term_info.setdefault(term.lower(), (len(self.term_info), entity_type, term))
+        self.terms_matcher = MultiPatternMatcher(self.term_info)
+        
+        # Relationship patterns (one alternation per relation type)
+        relation_patterns = {
+            'requires': [r'\brequires?\b', r'\bneeds?\b', r'\bdepends?\s+on\b'],
+            'provides': [r'\bprovides?\b', r'\boffers?\b', r'\benables?\b'],
+            'implements': [r'\bimplements?\b', r'\bsupports?\b', r'\bincludes?\b'],
+            'configures': [r'\bconfigures?\b', r'\bsets?\s+up\b', r'\bsettings?\s+for\b'],
+            'uses': [r'\buses?\b', r'\butilizes?\b', r'\bcalls?\b'],
+            'contains': [r'\bcontains?\b', r'\bincludes?\b', r'\bhas\b']
+        }
+        self.relation_patterns = {
+            relation_type: re.compile("|".join(patterns), re.IGNORECASE)
+            for relation_type, patterns in relation_patterns.items()
+        }
     
     def extract_entities(self, text: str, source_url: str = "") -> List[ExtractedEntity]:
         """Extract entities from text"""
         entities = []
-        text_lower = text.lower()
+        # 'İ'.lower() iki karakter üretir; pozisyonların text ile hizalı kalması için önce 'i' yapılır
+        text_lower = text.replace('İ', 'i').lower()
         
-        # Extract using regex patterns
-        for entity_type, patterns in self.compiled_patterns.items():
-            for pattern in patterns:
-                for match in pattern.finditer(text):
-                    entity = ExtractedEntity(
-                        text=match.group(),
-                        entity_type=entity_type,
-                        confidence=0.7,  # Base confidence for pattern matching
-                        context=self._get_context(text, match.start(), match.end()),
-                        start_pos=match.start(),
-                        end_pos=match.end()
-                    )
-                    entities.append(entity)
+        # Extract using regex patterns (single pass, pattern order preserved for overlap removal)
+        matches = sorted(
+            (match.lastindex, match.start(), match.end())
+            for match in self.mega_pattern.finditer(text_lower)
+        )
+        for group, start, end in matches:
+            entity = ExtractedEntity(
+                text=text[start:end],
+                entity_type=self.pattern_types[group - 1],
+                confidence=0.7,  # Base confidence for pattern matching
+                context=self._get_context(text, start, end),
+                start_pos=start,
+                end_pos=end
+            )
+            entities.append(entity)
         
-        # Extract known Netmera terms
-        for entity_type, terms in self.netmera_terms.items():
-            for term in terms:
-                term_lower = term.lower()
-                start_pos = 0
-                while True:
-                    pos = text_lower.find(term_lower, start_pos)
-                    if pos == -1:
-                        break
-                    
-                    entity = ExtractedEntity(
-                        text=text[pos:pos+len(term)],
-                        entity_type=entity_type,
-                        confidence=0.9,  # High confidence for known terms
-                        context=self._get_context(text, pos, pos+len(term)),
-                        start_pos=pos,
-                        end_pos=pos+len(term)
-                    )
-                    entities.append(entity)
-                    start_pos = pos + len(term)
+        # Extract known Netmera terms (one automaton pass, term order preserved)
+        term_matches = sorted(
+            (*self.term_info[term_lower], pos)
+            for pos, term_lower in self.terms_matcher.iter_matches(text_lower)
+        )
+        last_end = {}
+        for order, entity_type, term, pos in term_matches:
+            if pos < last_end.get(order, 0):
+                continue  # Aynı terimin örtüşen tekrarları (find döngüsü gibi)
+            
+            entity = ExtractedEntity(
+                text=text[pos:pos+len(term)],
+                entity_type=entity_type,
+                confidence=0.9,  # High confidence for known terms
+                context=self._get_context(text, pos, pos+len(term)),
+                start_pos=pos,
+                end_pos=pos+len(term)
+            )
+            entities.append(entity)
+            last_end[order] = pos + len(term)
         
         # Remove duplicates and overlaps
         entities = self._remove_overlaps(entities)
@@ -180,43 +217,46 @@ class EntityExtractor:
     
     def extract_relationships(self, text: str, entities: List[ExtractedEntity]) -> List[Tuple[str, str, str]]:
         """Extract relationships between entities in text"""
-        relationships = []
+        # Locate every relation keyword once: relation_type -> (sorted starts, ends)
+        keyword_spans = {}
+        for relation_type, pattern in self.relation_patterns.items():
+            spans = [match.span() for match in pattern.finditer(text)]
+            keyword_spans[relation_type] = ([start for start, _ in spans], [end for _, end in spans])
         
-        # Relationship patterns
-        relation_patterns = {
-            'requires': [r'\brequires?\b', r'\bneeds?\b', r'\bdepends?\s+on\b'],
-            'provides': [r'\bprovides?\b', r'\boffers?\b', r'\benables?\b'],
-            'implements': [r'\bimplements?\b', r'\bsupports?\b', r'\bincludes?\b'],
-            'configures': [r'\bconfigures?\b', r'\bsets?\s+up\b', r'\bsettings?\s+for\b'],
-            'uses': [r'\buses?\b', r'\butilizes?\b', r'\bcalls?\b'],
-            'contains': [r'\bcontains?\b', r'\bincludes?\b', r'\bhas\b']
-        }
-        
-        # Look for relationship patterns between entities
-        for i, entity1 in enumerate(entities):
-            for j, entity2 in enumerate(entities):
-                if i >= j:  # Avoid self-relations and duplicates
-                    continue
+        # Sliding window over entities sorted by position: only pairs within 100 chars
+        order = sorted(range(len(entities)), key=lambda k: entities[k].start_pos)
+        found = []
+        for a, i in enumerate(order):
+            for j in order[a + 1:]:
+                if entities[j].start_pos - entities[i].end_pos > 100:
+                    break  # Sonraki entity'ler daha da uzakta
                 
-                # Get text between entities
+                first, second = min(i, j), max(i, j)
+                entity1, entity2 = entities[first], entities[second]
+                
+                # Span between entities
                 start_pos = min(entity1.end_pos, entity2.end_pos)
                 end_pos = max(entity1.start_pos, entity2.start_pos)
                 
                 if end_pos - start_pos > 100:  # Too far apart
                     continue
                 
-                between_text = text[start_pos:end_pos].lower()
-                
-                # Check for relationship patterns
-                for relation_type, patterns in relation_patterns.items():
-                    for pattern in patterns:
-                        if re.search(pattern, between_text, re.IGNORECASE):
+                # Check for a relation keyword fully inside the span
+                for rank, (relation_type, (starts, ends)) in enumerate(keyword_spans.items()):
+                    k = bisect_left(starts, start_pos)
+                    while k < len(starts) and starts[k] < end_pos:
+                        if ends[k] <= end_pos:
                             # Determine direction based on position
                             if entity1.start_pos < entity2.start_pos:
-                                relationships.append((entity1.text, entity2.text, relation_type))
+                                found.append((first, second, rank, (entity1.text, entity2.text, relation_type)))
                             else:
-                                relationships.append((entity2.text, entity1.text, relation_type))
+                                found.append((first, second, rank, (entity2.text, entity1.text, relation_type)))
                             break
+                        k += 1
+        
+        # Keep the original pair order of the entity list
+        found.sort(key=lambda item: item[:3])
+        relationships = [relation for *_, relation in found]
         
         logger.debug(f"Extracted {len(relationships)} relationships")
         return relationships
@@ -233,17 +273,18 @@ class EntityExtractor:
         entities.sort(key=lambda x: x.confidence, reverse=True)
         
         non_overlapping = []
+        # Kept spans sorted by start; they never overlap, so ends are sorted too
+        kept_starts = []
+        kept_ends = []
         for entity in entities:
-            # Check if this entity overlaps with any existing one
-            overlaps = False
-            for existing in non_overlapping:
-                if (entity.start_pos < existing.end_pos and 
-                    entity.end_pos > existing.start_pos):
-                    overlaps = True
-                    break
+            # Only the last kept span starting before this entity ends can overlap it
+            k = bisect_left(kept_starts, entity.end_pos)
+            if k and kept_ends[k - 1] > entity.start_pos:
+                continue
             
-            if not overlaps:
-                non_overlapping.append(entity)
+            kept_starts.insert(k, entity.start_pos)
+            kept_ends.insert(k, entity.end_pos)
+            non_overlapping.append(entity)
         
         return non_overlapping
     
@@ -3,18 +3,24 @@ GraphRAG retriever for knowledge graph-based question answering
 """
 
 import logging
-from typing import List, Dict, Any, Optional
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Set, Tuple
 from dataclasses import dataclass
 from .graph_store import NetmeraGraphStore
 from .entity_extractor import EntityExtractor
+from ..config import GRAPH_RETRIEVAL_CACHE_SIZE
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+def _anchor_score(entity: Dict[str, Any]) -> float:
+    """Anchor sıralama skoru: graph eşleşmesi + çıkarım güveni"""
+    return entity.get('match_score', 0) + entity.get('extraction_confidence', 0)
+
+@dataclass(frozen=True)
 class GraphContext:
-    """Context retrieved from knowledge graph"""
-    entities: List[Dict[str, Any]]
-    relationships: List[Dict[str, Any]]
+    """Context retrieved from knowledge graph (cached and shared between callers; treat as read-only)"""
+    entities: Tuple[Dict[str, Any], ...]
+    relationships: Tuple[Dict[str, Any], ...]
     subgraph_info: str
     confidence: float
 
@@ -25,14 +31,21 @@ class GraphRAGRetriever:
         """Initialize GraphRAG retriever"""
         self.graph_store = graph_store
         self.entity_extractor = EntityExtractor()
+        # Aynı (sorgu, parametreler, graph sürümü) için sonuç tekrar hesaplanmaz; graph değişince anahtar değişir
+        self._retrieve_cached = lru_cache(maxsize=GRAPH_RETRIEVAL_CACHE_SIZE)(self._retrieve_impl)
         logger.info("GraphRAG retriever initialized")
     
     def retrieve(self, query: str, max_entities: int = 5, max_hops: int = 2) -> GraphContext:
         """Retrieve relevant context from knowledge graph"""
+        return self._retrieve_cached(query, max_entities, max_hops, self.graph_store.generation)
+    
+    def _retrieve_impl(self, query: str, max_entities: int, max_hops: int, generation: int) -> GraphContext:
+        """Uncached retrieval; generation only keys the cache"""
         logger.debug(f"GraphRAG retrieval for query: {query}")
         
         # Step 1: Extract anchor entities from query
-        anchor_entities = self._extract_anchor_entities(query)
+        seen_ids = set()
+        anchor_entities = self._extract_anchor_entities(query, seen_ids)
         logger.debug(f"Found anchor entities: {[e['name'] for e in anchor_entities]}")
         
         if not anchor_entities:
@@ -41,34 +54,31 @@ class GraphRAGRetriever:
             logger.debug(f"Fallback search found: {[e['name'] for e in anchor_entities]}")
         
         if not anchor_entities:
-            return GraphContext(entities=[], relationships=[], subgraph_info="", confidence=0.0)
-        
-        # Step 2: Expand context through graph traversal
-        all_entities = []
-        all_relationships = []
+            return GraphContext(entities=(), relationships=(), subgraph_info="", confidence=0.0)
         
+        # Step 2: Expand context through one graph traversal seeded with all anchors
+        # Anchor'lar tekil (çıkarımda seen_ids ile, fallback aramada zaten); tekrar dedup gerekmez
+        anchors = {}
         for anchor in anchor_entities[:max_entities]:
-            entity_id = anchor.get('entity_id')
-            if not entity_id:
-                continue
-            
-            # Get neighbors through graph traversal
-            neighbors = self.graph_store.get_neighbors(entity_id, max_hops=max_hops)
-            
-            # Add anchor entity
             anchor['hop_distance'] = 0
-            all_entities.append(anchor)
-            
-            # Add neighbors
-            all_entities.extend(neighbors)
-            
-            # Get relationships for this entity
-            relationships = self._get_entity_relationships(entity_id, neighbors)
-            all_relationships.extend(relationships)
-        
-        # Step 3: Remove duplicates and rank by relevance
-        unique_entities = self._deduplicate_entities(all_entities)
-        unique_relationships = self._deduplicate_relationships(all_relationships)
+            anchors[anchor['entity_id']] = anchor
+        
+        # Ortak komşular bir kez gezilir; her düğüm en yakın anchor'a olan hop mesafesini alır
+        reached = self.graph_store.multi_source_neighbors(list(anchors), max_hops=max_hops)
+        graph_nodes = self.graph_store.graph.nodes
+        # reached zaten tekil; entity'ler tek geçişte id → dict olarak toplanır
+        entities_by_id = {
+            node_id: anchors[node_id] if hops == 0 else
+            {**graph_nodes[node_id], 'entity_id': node_id, 'hop_distance': hops, 'anchor_id': owner}
+            for node_id, (hops, owner) in reached.items()
+        }
+        unique_entities = list(entities_by_id.values())
+        
+        # Anchor ile getirilen entity'ler arasındaki ilişkiler (source, target, relation_type) anahtarıyla toplanır
+        rels_by_key: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        for entity_id in anchors:
+            self._collect_entity_relationships(entity_id, unique_entities, rels_by_key)
+        unique_relationships = list(rels_by_key.values())
         
         # Step 4: Generate contextual information
         subgraph_info = self._build_subgraph_description(unique_entities, unique_relationships, query)
@@ -79,109 +89,103 @@ class GraphRAGRetriever:
         logger.debug(f"Retrieved {len(unique_entities)} entities and {len(unique_relationships)} relationships")
         
         return GraphContext(
-            entities=unique_entities,
-            relationships=unique_relationships, 
+            entities=tuple(unique_entities),
+            relationships=tuple(unique_relationships), 
             subgraph_info=subgraph_info,
             confidence=confidence
         )
     
-    def _extract_anchor_entities(self, query: str) -> List[Dict[str, Any]]:
-        """Extract entities from query that exist in the graph"""
+    def _extract_anchor_entities(self, query: str, seen_ids: Set[str]) -> List[Dict[str, Any]]:
+        """Extract entities from query that exist in the graph; each graph entity appears once (ids go to seen_ids)"""
         # Extract entities from query text
         extracted_entities = self.entity_extractor.extract_entities(query)
         
         # Find matching entities in graph
-        anchor_entities = []
+        anchors_by_id = {}
+        best_match_by_text = {}  # Aynı metin (büyük/küçük harf farkıyla) bir kez aranır
         for extracted in extracted_entities:
             # Search for this entity in the graph
-            matches = self.graph_store.search_entities(extracted.text, limit=1)
-            if matches:
-                best_match = matches[0]
-                best_match['extraction_confidence'] = extracted.confidence
-                best_match['query_text'] = extracted.text
-                anchor_entities.append(best_match)
+            text_key = extracted.text.lower()
+            if text_key not in best_match_by_text:
+                matches = self.graph_store.search_entities(extracted.text, limit=1)
+                best_match_by_text[text_key] = matches[0] if matches else None
+            best_match = best_match_by_text[text_key]
+            if best_match is None:
+                continue
+            
+            # Aynı entity'ye giden metinlerden en yüksek skorlu olan kalır
+            match_id = best_match['entity_id']
+            current = anchors_by_id.get(match_id)
+            if current is not None and _anchor_score(current) >= best_match['match_score'] + extracted.confidence:
+                continue
+            anchors_by_id[match_id] = {**best_match, 'extraction_confidence': extracted.confidence, 'query_text': extracted.text}
+            seen_ids.add(match_id)
+        anchor_entities = list(anchors_by_id.values())
         
         # Also try direct search for the whole query
         direct_matches = self.graph_store.search_entities(query, limit=2)
         for match in direct_matches:
             # Avoid duplicates
-            if not any(e.get('entity_id') == match.get('entity_id') for e in anchor_entities):
+            match_id = match['entity_id']
+            if match_id not in seen_ids:
+                seen_ids.add(match_id)
                 match['extraction_confidence'] = 0.6
                 match['query_text'] = query
                 anchor_entities.append(match)
         
         # Sort by relevance score
-        anchor_entities.sort(key=lambda x: x.get('match_score', 0) + x.get('extraction_confidence', 0), reverse=True)
+        anchor_entities.sort(key=_anchor_score, reverse=True)
         
         return anchor_entities
     
-    def _get_entity_relationships(self, entity_id: str, neighbors: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Get relationships for an entity and its neighbors"""
-        relationships = []
+    def _collect_entity_relationships(self, entity_id: str, neighbors: List[Dict[str, Any]],
+                                      relationships: Dict[Tuple[str, str, str], Dict[str, Any]]) -> None:
+        """Add relationships between an entity and its neighbors; the first one per key wins"""
+        graph = self.graph_store.graph
+        entity_name = graph.nodes[entity_id].get('name', entity_id)
+        # Komşu → {edge_key: attrs}; has_edge + get_edge_data yerine tek dict lookup
+        out_edges = graph._adj[entity_id]
+        in_edges = graph._pred[entity_id]
         
         # Get all edges involving this entity
         for neighbor in neighbors:
             neighbor_id = neighbor.get('entity_id')
-            if not neighbor_id:
+            if not neighbor_id or neighbor_id == entity_id:
                 continue
             
             # Get edge data between entity and neighbor
-            if self.graph_store.graph.has_edge(entity_id, neighbor_id):
-                edge_data = self.graph_store.graph.get_edge_data(entity_id, neighbor_id)
-                for edge_key, edge_attrs in edge_data.items():
-                    relationship = {
-                        'source_id': entity_id,
-                        'target_id': neighbor_id,
-                        'source_name': self.graph_store.get_entity(entity_id).get('name', entity_id),
-                        'target_name': neighbor.get('name', neighbor_id),
-                        'relation_type': edge_attrs.get('relation_type', 'related'),
-                        'description': edge_attrs.get('description', ''),
-                        **edge_attrs
-                    }
-                    relationships.append(relationship)
+            edge_data = out_edges.get(neighbor_id)
+            if edge_data:
+                neighbor_name = neighbor.get('name', neighbor_id)
+                for edge_attrs in edge_data.values():
+                    rel_key = (entity_id, neighbor_id, edge_attrs.get('relation_type', 'related'))
+                    if rel_key not in relationships:
+                        relationships[rel_key] = {
+                            'source_id': entity_id,
+                            'target_id': neighbor_id,
+                            'source_name': entity_name,
+                            'target_name': neighbor_name,
+                            'relation_type': 'related',
+                            'description': '',
+                            **edge_attrs  # Kenar özellikleri (relation_type, description dahil) varsayılanları ezer
+                        }
             
             # Check reverse direction
-            if self.graph_store.graph.has_edge(neighbor_id, entity_id):
-                edge_data = self.graph_store.graph.get_edge_data(neighbor_id, entity_id)
-                for edge_key, edge_attrs in edge_data.items():
-                    relationship = {
-                        'source_id': neighbor_id,
-                        'target_id': entity_id,
-                        'source_name': neighbor.get('name', neighbor_id),
-                        'target_name': self.graph_store.get_entity(entity_id).get('name', entity_id),
-                        'relation_type': edge_attrs.get('relation_type', 'related'),
-                        'description': edge_attrs.get('description', ''),
-                        **edge_attrs
-                    }
-                    relationships.append(relationship)
-        
-        return relationships
-    
-    def _deduplicate_entities(self, entities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Remove duplicate entities"""
-        seen_ids = set()
-        unique_entities = []
-        
-        for entity in entities:
-            entity_id = entity.get('entity_id')
-            if entity_id and entity_id not in seen_ids:
-                seen_ids.add(entity_id)
-                unique_entities.append(entity)
-        
-        return unique_entities
-    
-    def _deduplicate_relationships(self, relationships: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Remove duplicate relationships"""
-        seen_rels = set()
-        unique_relationships = []
-        
-        for rel in relationships:
-            rel_key = (rel.get('source_id'), rel.get('target_id'), rel.get('relation_type'))
-            if rel_key not in seen_rels:
-                seen_rels.add(rel_key)
-                unique_relationships.append(rel)
-        
-        return unique_relationships
+            edge_data = in_edges.get(neighbor_id)
+            if edge_data:
+                neighbor_name = neighbor.get('name', neighbor_id)
+                for edge_attrs in edge_data.values():
+                    rel_key = (neighbor_id, entity_id, edge_attrs.get('relation_type', 'related'))
+                    if rel_key not in relationships:
+                        relationships[rel_key] = {
+                            'source_id': neighbor_id,
+                            'target_id': entity_id,
+                            'source_name': neighbor_name,
+                            'target_name': entity_name,
+                            'relation_type': 'related',
+                            'description': '',
+                            **edge_attrs
+                        }
     
     def _build_subgraph_description(self, entities: List[Dict[str, Any]], 
                                    relationships: List[Dict[str, Any]], query: str) -> str:
@@ -243,14 +247,21 @@ class GraphRAGRetriever:
         if not anchor_entities:
             return 0.0
         
+        # Anchor güveni ve eşleşme skoru tek geçişte toplanır
+        extraction_total = 0.0
+        match_total = 0.0
+        for e in anchor_entities:
+            extraction_total += e.get('extraction_confidence', 0.5)
+            match_total += e.get('match_score', 0)
+        
         # Base confidence from anchor entities
-        anchor_confidence = sum(e.get('extraction_confidence', 0.5) for e in anchor_entities) / len(anchor_entities)
+        anchor_confidence = extraction_total / len(anchor_entities)
         
         # Boost confidence based on entity coverage
         entity_coverage = min(len(all_entities) / 10.0, 1.0)  # Normalize to 0-1
         
         # Boost confidence if we found strong matches
-        match_confidence = sum(e.get('match_score', 0) for e in anchor_entities) / (len(anchor_entities) * 10.0)
+        match_confidence = match_total / (len(anchor_entities) * 10.0)
         
         # Combined confidence
         confidence = (anchor_confidence * 0.5) + (entity_coverage * 0.3) + (match_confidence * 0.2)
@@ -4,14 +4,35 @@ Graph Store implementation using NetworkX for Netmera knowledge graph
 
 import logging
 import networkx as nx
-from typing import List, Dict, Any, Optional, Tuple
+from collections import Counter, deque
+from operator import itemgetter
+from typing import List, Dict, Any, Iterable, Optional, Set, Tuple
 from dataclasses import dataclass
 import pickle
 import os
+import heapq
+import re
+import sys
 from pathlib import Path
 
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
 logger = logging.getLogger(__name__)
 
+# Kayıt formatı: magic + sürüm baytı + zstd ile sıkıştırılmış pickle (HIGHEST_PROTOCOL).
+# Başlıksız dosyalar eski düz pickle olarak yüklenir.
+_GRAPH_MAGIC = b"NMKG"
+_GRAPH_FORMAT_ZSTD = 1
+
+# İsim/açıklama token'ları (inverted index için)
+_TOKEN_SPLIT_RE = re.compile(r"\W+")
+
+_MAX_MATCH_SCORE = 15  # search_entities: isim (10) + açıklama (5) eşleşmesi
+
 @dataclass
 class Entity:
     """Netmera domain entity"""
@@ -37,6 +58,13 @@ class NetmeraGraphStore:
         """Initialize graph store"""
         self.graph = nx.MultiDiGraph()
         self.graph_path = graph_path or "data/graph/netmera_knowledge_graph.pkl"
+        # search_entities için token → node id inverted index'i ve graph'taki ekleme sırası
+        self._token_index: Dict[str, Set[str]] = {}
+        self._node_rank: Dict[str, int] = {}
+        # node id → (küçük harf isim, küçük harf açıklama); aramada her düğüm için lower() tekrarlanmaz
+        self._search_text: Dict[str, Tuple[str, str]] = {}
+        # Graph her değiştiğinde artar; graph'tan türetilen cache'ler anahtarlarına ekler
+        self.generation = 0
         self.entity_types = {
             "SDK": "Software Development Kit components",
             "API": "API endpoints and methods", 
@@ -56,10 +84,12 @@ class NetmeraGraphStore:
         self.graph.add_node(
             entity.id,
             name=entity.name,
-            type=entity.type,
+            type=sys.intern(entity.type),  # Az sayıda tekrar eden etiket: tüm düğümler tek nesneyi paylaşır
             description=entity.description,
             **entity.properties
         )
+        self._index_entity(entity.id, entity.name, entity.description)
+        self.generation += 1
         logger.debug(f"Added entity: {entity.name} ({entity.type})")
     
     def add_relationship(self, relationship: Relationship) -> None:
@@ -67,12 +97,59 @@ class NetmeraGraphStore:
         self.graph.add_edge(
             relationship.source,
             relationship.target,
-            relation_type=relationship.relation_type,
+            relation_type=sys.intern(relationship.relation_type),
             description=relationship.description,
             **relationship.properties
         )
+        # add_edge eksik düğümleri (önce kaynak, sonra hedef) oluşturur; sıralamayı graph ile aynı tut
+        self._node_rank.setdefault(relationship.source, len(self._node_rank))
+        self._node_rank.setdefault(relationship.target, len(self._node_rank))
+        self.generation += 1
         logger.debug(f"Added relationship: {relationship.source} --{relationship.relation_type}--> {relationship.target}")
     
+    def _index_entity(self, entity_id: str, name: str, description: str) -> None:
+        """Add an entity's name/description tokens to the search index"""
+        self._node_rank.setdefault(entity_id, len(self._node_rank))
+        search_text = self._search_text[entity_id] = (name.lower(), description.lower())
+        for text in search_text:
+            for token in _TOKEN_SPLIT_RE.split(text):
+                if token:
+                    self._token_index.setdefault(token, set()).add(entity_id)
+    
+    def _intern_labels(self) -> None:
+        """Intern entity types and relation types of a loaded graph (legacy pickles may carry copies)"""
+        for _, node_data in self.graph.nodes(data=True):
+            if isinstance(node_data.get('type'), str):
+                node_data['type'] = sys.intern(node_data['type'])
+        for _, _, edge_data in self.graph.edges(data=True):
+            if isinstance(edge_data.get('relation_type'), str):
+                edge_data['relation_type'] = sys.intern(edge_data['relation_type'])
+    
+    def _rebuild_index(self) -> None:
+        """Rebuild the search index from the current graph (after load)"""
+        self._token_index = {}
+        self._node_rank = {}
+        self._search_text = {}
+        for node_id, node_data in self.graph.nodes(data=True):
+            self._index_entity(node_id, node_data.get('name', ''), node_data.get('description', ''))
+    
+    def _search_candidates(self, query_lower: str) -> Iterable[str]:
+        """
+        Node ids that may contain query_lower in their name/description, in graph order.
+        Every query token lies inside a single name/description token of a match, so the
+        union of postings of index tokens containing the longest query token is a superset.
+        """
+        tokens = [token for token in _TOKEN_SPLIT_RE.split(query_lower) if token]
+        if not tokens:
+            return list(self.graph)  # Token'sız sorgu (boş/noktalama): tam tarama
+        
+        probe = max(tokens, key=len)
+        candidates = set()
+        for token, node_ids in self._token_index.items():
+            if probe in token:
+                candidates |= node_ids
+        return sorted(candidates, key=self._node_rank.__getitem__)
+    
     def get_entity(self, entity_id: str) -> Optional[Dict[str, Any]]:
         """Get entity by ID"""
         if self.graph.has_node(entity_id):
@@ -84,12 +161,21 @@ class NetmeraGraphStore:
         if not self.graph.has_node(entity_id):
             return []
         
+        if not relation_types:
+            # Filtresiz traversal tek kaynaklı multi_source_neighbors ile aynı (sıra ve hop mesafeleri dahil)
+            nodes = self.graph.nodes
+            return [
+                {**nodes[node_id], 'entity_id': node_id, 'hop_distance': hops}
+                for node_id, (hops, _) in self.multi_source_neighbors([entity_id], max_hops).items()
+                if hops > 0
+            ]
+        
         neighbors = []
         visited = set()
-        queue = [(entity_id, 0)]  # (node_id, hop_count)
+        queue = deque([(entity_id, 0)])  # (node_id, hop_count)
         
         while queue:
-            current_id, hops = queue.pop(0)
+            current_id, hops = queue.popleft()
             
             if hops > max_hops or current_id in visited:
                 continue
@@ -98,10 +184,7 @@ class NetmeraGraphStore:
             
             # Get current node info
             if hops > 0:  # Don't include the starting node
-                node_data = dict(self.graph.nodes[current_id])
-                node_data['entity_id'] = current_id
-                node_data['hop_distance'] = hops
-                neighbors.append(node_data)
+                neighbors.append({**self.graph.nodes[current_id], 'entity_id': current_id, 'hop_distance': hops})
             
             # Add connected nodes to queue
             for neighbor_id in self.graph.neighbors(current_id):
@@ -117,14 +200,37 @@ class NetmeraGraphStore:
         
         return neighbors
     
+    def multi_source_neighbors(self, seed_ids: List[str], max_hops: int = 2) -> Dict[str, Tuple[int, str]]:
+        """
+        Single BFS seeded with all entities at once.
+        Returns {node_id: (hop_distance, owning_seed_id)} in BFS order (seeds first, hop 0);
+        each node is expanded once and gets its minimum hop distance to any seed.
+        """
+        visited = {seed_id: (0, seed_id) for seed_id in seed_ids if seed_id in self.graph}
+        adj = self.graph._adj
+        
+        # Seviye seviye genişletme: deque ve düğüm başına hop takibi yok, ziyaret sırası FIFO BFS ile aynı
+        frontier = list(visited)
+        for hops in range(1, max_hops + 1):
+            next_frontier = []
+            for current_id in frontier:
+                entry = (hops, visited[current_id][1])  # Aynı ebeveynden ulaşılan düğümler tuple'ı paylaşır
+                for neighbor_id in adj[current_id]:
+                    if neighbor_id not in visited:
+                        visited[neighbor_id] = entry
+                        next_frontier.append(neighbor_id)
+            if not next_frontier:
+                break
+            frontier = next_frontier
+        
+        return visited
+    
     def find_entities_by_type(self, entity_type: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Find entities by type"""
         entities = []
         for node_id, node_data in self.graph.nodes(data=True):
             if node_data.get('type') == entity_type:
-                entity_data = dict(node_data)
-                entity_data['entity_id'] = node_id
-                entities.append(entity_data)
+                entities.append({**node_data, 'entity_id': node_id})
                 
                 if len(entities) >= limit:
                     break
@@ -134,11 +240,14 @@ class NetmeraGraphStore:
     def search_entities(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Search entities by name/description"""
         query_lower = query.lower()
-        matches = []
+        scored = []  # (score, node_id), graph sırasında
+        top_count = 0
+        search_text = self._search_text
+        no_text = ('', '')  # add_relationship ile oluşan isimsiz düğümler
         
-        for node_id, node_data in self.graph.nodes(data=True):
-            name = node_data.get('name', '').lower()
-            description = node_data.get('description', '').lower()
+        # Sadece index'ten gelen adaylar puanlanır (eşleşme kuralı aynı: alt dizi içerme)
+        for node_id in self._search_candidates(query_lower):
+            name, description = search_text.get(node_id, no_text)
             
             # Simple text matching - could be enhanced with fuzzy matching
             score = 0
@@ -148,24 +257,26 @@ class NetmeraGraphStore:
                 score += 5
             
             if score > 0:
-                entity_data = dict(node_data)
-                entity_data['entity_id'] = node_id
-                entity_data['match_score'] = score
-                matches.append(entity_data)
+                scored.append((score, node_id))
+                # Eşit skorda önceki düğüm kazanır; limit kadar tam puan bulunduysa sonrakiler giremez
+                if score == _MAX_MATCH_SCORE:
+                    top_count += 1
+                    if top_count >= limit:
+                        break
         
-        # Sort by score and return top matches
-        matches.sort(key=lambda x: x['match_score'], reverse=True)
-        return matches[:limit]
+        # nlargest stabil: sorted(reverse=True)[:limit] ile aynı sıra, dict kopyası sadece sonuçlar için
+        nodes = self.graph.nodes
+        return [
+            {**nodes[node_id], 'entity_id': node_id, 'match_score': score}
+            for score, node_id in heapq.nlargest(limit, scored, key=itemgetter(0))
+        ]
     
     def get_subgraph(self, entity_ids: List[str], max_hops: int = 2) -> nx.MultiDiGraph:
         """Get subgraph containing specified entities and their neighbors"""
         subgraph_nodes = set(entity_ids)
         
-        # Add neighbors for each entity
-        for entity_id in entity_ids:
-            neighbors = self.get_neighbors(entity_id, max_hops)
-            for neighbor in neighbors:
-                subgraph_nodes.add(neighbor['entity_id'])
+        # Add neighbors of all entities in one traversal
+        subgraph_nodes.update(self.multi_source_neighbors(entity_ids, max_hops))
         
         return self.graph.subgraph(subgraph_nodes).copy()
     
@@ -173,7 +284,12 @@ class NetmeraGraphStore:
         """Save graph to disk"""
         os.makedirs(os.path.dirname(self.graph_path), exist_ok=True)
         with open(self.graph_path, 'wb') as f:
-            pickle.dump(self.graph, f)
+            if HAS_ZSTD:
+                f.write(_GRAPH_MAGIC + bytes([_GRAPH_FORMAT_ZSTD]))
+                with zstandard.ZstdCompressor().stream_writer(f, closefd=False) as writer:
+                    pickle.dump(self.graph, writer, protocol=pickle.HIGHEST_PROTOCOL)
+            else:
+                pickle.dump(self.graph, f, protocol=pickle.HIGHEST_PROTOCOL)
         logger.info(f"Graph saved to {self.graph_path}")
     
     def load_graph(self) -> None:
@@ -181,7 +297,7 @@ class NetmeraGraphStore:
         if os.path.exists(self.graph_path):
             try:
                 with open(self.graph_path, 'rb') as f:
-                    self.graph = pickle.load(f)
+                    self.graph = self._read_graph(f)
                 logger.info(f"Graph loaded from {self.graph_path}")
                 logger.info(f"Graph stats: {self.graph.number_of_nodes()} nodes, {self.graph.number_of_edges()} edges")
             except Exception as e:
@@ -189,27 +305,41 @@ class NetmeraGraphStore:
                 self.graph = nx.MultiDiGraph()
         else:
             logger.info("No existing graph found, starting with empty graph")
+        
+        self._intern_labels()
+        self._rebuild_index()
+        self.generation += 1
+    
+    @staticmethod
+    def _read_graph(f) -> nx.MultiDiGraph:
+        """Read a graph file written by save_graph (or a legacy plain pickle)"""
+        header = f.read(len(_GRAPH_MAGIC) + 1)
+        if not header.startswith(_GRAPH_MAGIC):
+            f.seek(0)
+            return pickle.load(f)
+        
+        version = header[-1]
+        if version != _GRAPH_FORMAT_ZSTD:
+            raise ValueError(f"Unsupported graph file version: {version}")
+        if not HAS_ZSTD:
+            raise ImportError("zstandard is required to load this graph file")
+        with zstandard.ZstdDecompressor().stream_reader(f) as reader:
+            return pickle.loads(reader.read())
     
     def get_stats(self) -> Dict[str, Any]:
         """Get graph statistics"""
-        stats = {
+        # Tek geçişte sayım; Counter ilk görülme sırasını korur
+        entity_types = Counter(entity_type for _, entity_type in self.graph.nodes(data='type', default='Unknown'))
+        relation_types = Counter(
+            relation_type for _, _, relation_type in self.graph.edges(data='relation_type', default='Unknown')
+        )
+        
+        return {
             'total_nodes': self.graph.number_of_nodes(),
             'total_edges': self.graph.number_of_edges(),
-            'entity_types': {},
-            'relation_types': {}
+            'entity_types': dict(entity_types),
+            'relation_types': dict(relation_types)
         }
-        
-        # Count entity types
-        for _, node_data in self.graph.nodes(data=True):
-            entity_type = node_data.get('type', 'Unknown')
-            stats['entity_types'][entity_type] = stats['entity_types'].get(entity_type, 0) + 1
-        
-        # Count relation types
-        for _, _, edge_data in self.graph.edges(data=True):
-            relation_type = edge_data.get('relation_type', 'Unknown')
-            stats['relation_types'][relation_type] = stats['relation_types'].get(relation_type, 0) + 1
-        
-        return stats
     
     def build_sample_graph(self) -> None:
         """Build a sample Netmera knowledge graph for testing"""
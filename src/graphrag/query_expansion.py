@@ -4,21 +4,55 @@ Provides semantic bridging between Turkish/English and technical concepts
 """
 
 import re
+import sys
 import logging
+import threading
+from bisect import bisect_right
+from functools import cached_property, lru_cache
+from itertools import chain
 from typing import List, Dict, Set, Tuple, Optional
 from dataclasses import dataclass
 
+from ..config import QUERY_ANALYSIS_CACHE_SIZE
+from ..multi_pattern import MultiPatternMatcher
+
 logger = logging.getLogger(__name__)
 
-@dataclass
+_WORD_RE = re.compile(r"\w+")
+
+@lru_cache(maxsize=QUERY_ANALYSIS_CACHE_SIZE)
+def _term_tokens(term: str) -> Tuple[str, ...]:
+    """Lowercased word tokens of an expansion term (terms come from the fixed taxonomy)"""
+    return tuple(_WORD_RE.findall(term.lower()))
+
+def _contains_term(query_token_set: frozenset, query_phrase: str, term: str) -> bool:
+    """
+    True if term already occurs in the query as whole words ("push" is not in "pushes").
+    Single-word terms are a set lookup; multi-word terms must appear as a contiguous token run
+    in query_phrase (space-joined query tokens, padded with spaces).
+    """
+    term_tokens = _term_tokens(term)
+    if len(term_tokens) == 1:
+        return term_tokens[0] in query_token_set
+    return f" {' '.join(term_tokens)} " in query_phrase
+
+_KEY_SEPARATOR = "\0"  # Taksonomi anahtarlarında ve sorgu kelimelerinde geçmez
+
+@dataclass(frozen=True)
 class ExpandedQuery:
-    """Result of query expansion"""
+    """Result of query expansion (cached and shared between callers; treat as read-only)"""
     original_query: str
-    expanded_query: str
     added_terms: List[str]
     detected_entities: List[str]
     language: str
     expansion_confidence: float
+    
+    @cached_property
+    def expanded_query(self) -> str:
+        """Original query followed by the added terms (built on first access)"""
+        if self.added_terms:
+            return f"{self.original_query} {' '.join(self.added_terms)}"
+        return self.original_query
 
 class NetmeraTaxonomy:
     """Netmera domain-specific taxonomy and synonym mapping"""
@@ -108,19 +142,55 @@ class NetmeraTaxonomy:
         }
         
         # Create reverse mappings for efficient lookup
+        # Anahtarlar bir kez küçültülüp intern edilir; aramalar hiçbir zaman anahtar üzerinde .lower() çağırmaz
         self.all_mappings = {}
         for main_term, synonyms in self.concept_mappings.items():
-            self.all_mappings[main_term.lower()] = synonyms
-            for synonym in synonyms:
-                if synonym.lower() not in self.all_mappings:
-                    self.all_mappings[synonym.lower()] = [main_term] + [s for s in synonyms if s != synonym]
+            self._add_mapping(main_term, synonyms)
         
         # Add error and platform terms
-        for main_term, synonyms in {**self.error_patterns, **self.platform_terms}.items():
-            self.all_mappings[main_term.lower()] = synonyms
-            for synonym in synonyms:
-                if synonym.lower() not in self.all_mappings:
-                    self.all_mappings[synonym.lower()] = [main_term] + [s for s in synonyms if s != synonym]
+        for main_term, synonyms in chain(self.error_patterns.items(), self.platform_terms.items()):
+            self._add_mapping(main_term, synonyms)
+        
+        # Anahtarlar için find_synonyms sonucu baştan hesaplanır (doğrudan eşleşme: ilk 5 eşanlamlı)
+        self.synonym_table = {key: tuple(values[:5]) for key, values in self.all_mappings.items()}
+        
+        # Kısmi eşleşme index'leri: terimin içindeki anahtarlar tek otomat taramasıyla,
+        # terimi içeren anahtarlar birleştirilmiş anahtar metninde C seviyesinde find ile bulunur
+        self._keys = list(self.all_mappings)
+        self._key_order = {key: i for i, key in enumerate(self._keys)}
+        self._key_matcher = MultiPatternMatcher(self._keys)
+        self._joined_keys = _KEY_SEPARATOR.join(self._keys)
+        self._key_starts = []
+        offset = 0
+        for key in self._keys:
+            self._key_starts.append(offset)
+            offset += len(key) + len(_KEY_SEPARATOR)
+    
+    def _add_mapping(self, main_term: str, synonyms: List[str]) -> None:
+        """Map main_term to its synonyms and each synonym (if not yet a key) to the rest of the group"""
+        self.all_mappings[sys.intern(main_term.lower())] = synonyms
+        for synonym in synonyms:
+            synonym_lower = sys.intern(synonym.lower())
+            if synonym_lower not in self.all_mappings:
+                self.all_mappings[synonym_lower] = [main_term] + [s for s in synonyms if s != synonym]
+    
+    def partial_matches(self, term_lower: str) -> List[str]:
+        """Keys that contain term_lower or are contained in it, in all_mappings order"""
+        if not term_lower:
+            return list(self.all_mappings)  # Boş terim her anahtarın alt dizisi
+        
+        matched = self._key_matcher.find_all(term_lower)
+        if _KEY_SEPARATOR not in term_lower:
+            joined, starts = self._joined_keys, self._key_starts
+            pos = joined.find(term_lower)
+            while pos != -1:
+                key_index = bisect_right(starts, pos) - 1
+                matched.add(self._keys[key_index])
+                if key_index + 1 == len(starts):
+                    break
+                pos = joined.find(term_lower, starts[key_index + 1])  # Sonraki anahtardan devam
+        
+        return sorted(matched, key=self._key_order.__getitem__)
 
 class QueryExpander:
     """Expands queries with Netmera domain knowledge and semantic bridging"""
@@ -130,7 +200,7 @@ class QueryExpander:
         self.taxonomy = NetmeraTaxonomy()
         
         # Language detection patterns
-        self.turkish_chars = set("çğıöşü")
+        self.turkish_chars = frozenset("çğıöşü")
         
         # Entity extraction patterns
         self.entity_patterns = [
@@ -142,38 +212,76 @@ class QueryExpander:
         ]
         
         self.compiled_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in self.entity_patterns]
+        
+        # Yukarıdaki desenlerin tek geçişlik karşılığı. IGNORECASE altında CamelCase deseni harflerden oluşan
+        # her kelimeyi (>= 2 harf) yakalar; ilk üç desen ve tek kelimelik framework'ler bunun alt kümesidir.
+        # Çok kelimeli "React Native" aynı konumda lookahead grubuyla ayrıca alınır. İç içe tekrar eden
+        # CamelCase grubu uzun kelimelerde üstel geri izlemeye yol açtığı için düz kelime deseni kullanılır.
+        self.entity_pattern = re.compile(r'\b(?:(?=(React\s+Native)\b))?[A-Z][a-z]+\b', re.IGNORECASE)
+        
+        # Expansion sorgu ve parametrenin saf fonksiyonu; tekrar eden sorgular yeniden genişletilmez
+        self._expand_cached = lru_cache(maxsize=QUERY_ANALYSIS_CACHE_SIZE)(self._expand_query_uncached)
+        # Taksonomide olmayan kelimelerin kısmi eşleşmeleri ve kelime başına çeviri adayları
+        self._partial_synonyms = lru_cache(maxsize=QUERY_ANALYSIS_CACHE_SIZE)(self._find_partial_synonyms)
+        self._translations = lru_cache(maxsize=QUERY_ANALYSIS_CACHE_SIZE)(self._find_translations)
+    
+    def cache_clear(self) -> None:
+        """Drop memoized expansions (e.g. after changing the taxonomy)"""
+        self._expand_cached.cache_clear()
+        self._partial_synonyms.cache_clear()
+        self._translations.cache_clear()
     
     def detect_language(self, query: str) -> str:
         """Detect query language (Turkish vs English)"""
-        query_lower = query.lower()
-        turkish_char_count = sum(1 for char in query_lower if char in self.turkish_chars)
-        return "tr" if turkish_char_count > 0 else "en"
+        return self._language_of(query.lower())
+    
+    def _language_of(self, text_lower: str) -> str:
+        """detect_language for already lowercased text"""
+        return "en" if self.turkish_chars.isdisjoint(text_lower) else "tr"
+    
+    def _has_turkish_chars(self, text: str) -> bool:
+        """True if text contains a Turkish-specific letter (set check runs in C, stops at the first hit)"""
+        return not self.turkish_chars.isdisjoint(text.lower())
     
     def extract_entities(self, query: str) -> List[str]:
         """Extract potential entities from query"""
         entities = []
-        for pattern in self.compiled_patterns:
-            matches = pattern.findall(query)
-            entities.extend(matches)
+        for match in self.entity_pattern.finditer(query):
+            entities.append(match.group(0))
+            if match.group(1):
+                entities.append(match.group(1))
         
         # Deduplicate and clean
         return list(set([entity.strip() for entity in entities if entity.strip()]))
     
     def find_synonyms(self, term: str) -> List[str]:
         """Find synonyms for a given term using taxonomy"""
-        term_lower = term.lower().strip()
-        
-        # Direct lookup
-        if term_lower in self.taxonomy.all_mappings:
-            return self.taxonomy.all_mappings[term_lower][:5]  # Limit to top 5
+        return list(self._lookup_synonyms(term.lower().strip()))
+    
+    def _lookup_synonyms(self, term_lower: str) -> Tuple[str, ...]:
+        """find_synonyms for an already lowercased, stripped term (shared tuple, do not mutate)"""
+        # Direct lookup (top 5, precomputed)
+        direct = self.taxonomy.synonym_table.get(term_lower)
+        if direct is not None:
+            return direct
         
+        return self._partial_synonyms(term_lower)
+    
+    def _find_partial_synonyms(self, term_lower: str) -> Tuple[str, ...]:
+        """Synonyms of taxonomy keys partially matching term_lower (uncached)"""
         # Partial matching for compound terms
         synonyms = []
-        for key, values in self.taxonomy.all_mappings.items():
-            if term_lower in key or key in term_lower:
-                synonyms.extend(values[:3])  # Fewer for partial matches
+        for key in self.taxonomy.partial_matches(term_lower):
+            synonyms.extend(self.taxonomy.all_mappings[key][:3])  # Fewer for partial matches
         
-        return list(set(synonyms))[:5]  # Deduplicate and limit
+        return tuple(list(set(synonyms))[:5])  # Deduplicate and limit
+    
+    def _find_translations(self, term_lower: str, language: str) -> Tuple[str, ...]:
+        """Up to two synonyms of term_lower in the language opposite to `language` (uncached)"""
+        synonyms = self._lookup_synonyms(term_lower)
+        # Filter synonyms to opposite language
+        want_turkish = language != "tr"
+        return tuple([s for s in synonyms if self._has_turkish_chars(s) == want_turkish][:2])
     
     def expand_query(self, query: str, max_expansion_terms: int = 8) -> ExpandedQuery:
         """
@@ -186,50 +294,67 @@ class QueryExpander:
         Returns:
             ExpandedQuery with expanded terms and metadata
         """
+        return self._expand_cached(query, max_expansion_terms)
+    
+    def expand_queries(self, queries: List[str], max_expansion_terms: int = 8) -> List[ExpandedQuery]:
+        """
+        Expand many queries; each distinct query is expanded once.
+        Per-word synonym, partial-match and translation lookups are memoized, so words shared
+        between queries are resolved a single time across the batch.
+        """
+        expanded = {query: self.expand_query(query, max_expansion_terms) for query in dict.fromkeys(queries)}
+        return [expanded[query] for query in queries]
+    
+    def _expand_query_uncached(self, query: str, max_expansion_terms: int) -> ExpandedQuery:
+        """Uncached expansion"""
         logger.debug(f"Expanding query: {query}")
         
+        # Sorgu bir kez küçültülür; dil tespiti, kelimeler ve token'lar bu kopyayı kullanır
+        query_lower = query.lower()
+        
         # Detect language
-        language = self.detect_language(query)
+        language = self._language_of(query_lower)
         
         # Extract entities
         entities = self.extract_entities(query)
         
         # Find expansion terms
         expansion_terms = []
-        query_words = query.lower().split()
+        query_words = query_lower.split()
         
         # Expand individual words and detected entities
         terms_to_expand = set(query_words + [e.lower() for e in entities])
         
         for term in terms_to_expand:
-            synonyms = self.find_synonyms(term)
-            expansion_terms.extend(synonyms)
+            # split() ve entity deseni boşluksuz, küçük harfli terim verir; find_synonyms'in normalizasyonu gereksiz
+            expansion_terms.extend(self._lookup_synonyms(term))
         
         # Remove duplicates and terms already in query
         unique_expansions = []
-        query_lower = query.lower()
+        seen_terms = set()  # unique_expansions üyelik kontrolü (listede arama yerine)
+        query_tokens = _WORD_RE.findall(query_lower)
+        query_token_set = frozenset(query_tokens)
+        query_phrase = f" {' '.join(query_tokens)} "
         for term in expansion_terms:
-            if (term.lower() not in query_lower and 
-                term not in unique_expansions and 
+            if (term not in seen_terms and
+                not _contains_term(query_token_set, query_phrase, term) and 
                 len(term.strip()) > 2):  # Skip very short terms
+                seen_terms.add(term)
                 unique_expansions.append(term)
         
         # Limit expansion terms
         limited_expansions = unique_expansions[:max_expansion_terms]
         
-        # Build expanded query
+        # Expanded query metni ExpandedQuery.expanded_query ilk okunduğunda oluşturulur
         if limited_expansions:
-            expanded_query = f"{query} {' '.join(limited_expansions)}"
             expansion_confidence = min(len(limited_expansions) / max_expansion_terms, 1.0)
         else:
-            expanded_query = query
             expansion_confidence = 0.0
         
         logger.debug(f"Added {len(limited_expansions)} expansion terms: {limited_expansions}")
         
         return ExpandedQuery(
             original_query=query,
-            expanded_query=expanded_query,
             added_terms=limited_expansions,
             detected_entities=entities,
             language=language,
@@ -246,14 +371,7 @@ class QueryExpander:
         translated_variants = []
         
         for word in words:
-            synonyms = self.find_synonyms(word)
-            # Filter synonyms to opposite language
-            if language == "tr":
-                en_synonyms = [s for s in synonyms if not any(c in self.turkish_chars for c in s.lower())]
-                translated_variants.extend(en_synonyms[:2])
-            else:
-                tr_synonyms = [s for s in synonyms if any(c in self.turkish_chars for c in s.lower())]
-                translated_variants.extend(tr_synonyms[:2])
+            translated_variants.extend(self._translations(word.lower().strip(), language))
         
         if translated_variants:
             cross_lang_query = f"{query} {' '.join(translated_variants[:4])}"
@@ -280,3 +398,16 @@ class QueryExpander:
             "platform_terms": len(self.taxonomy.platform_terms),
             "entity_patterns": len(self.entity_patterns)
         }
+
+# Taksonomi ve kısmi eşleşme index'leri tek sefer kurulur; genişletme cache'leri tüm çağıranlarca paylaşılır
+_default_expander: Optional[QueryExpander] = None
+_default_expander_lock = threading.Lock()
+
+def get_expander() -> QueryExpander:
+    """Shared QueryExpander for the process (created on first use)"""
+    global _default_expander
+    if _default_expander is None:
+        with _default_expander_lock:
+            if _default_expander is None:
+                _default_expander = QueryExpander()
+    return _default_expander
@@ -4,11 +4,23 @@ Query router to decide between FAISS vector search vs GraphRAG
 
 import re
 import logging
-from typing import Dict, List
+import threading
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Optional, Set
 from enum import Enum
 
+from ..config import QUERY_ANALYSIS_CACHE_SIZE
+from ..multi_pattern import MultiPatternMatcher
+
 logger = logging.getLogger(__name__)
 
+# Desen başına 0.3 puan: 4 eşleşme skoru tavana (1.0) taşır, kalan desenler kararı değiştirmez
+_SATURATING_PATTERN_HITS = 4
+
+# Yalnızca kelime listesinden oluşan desenler: \b(?:a|b|c)\b
+_WORD_LIST_PATTERN_RE = re.compile(r'\\b\(\?:([^()]*)\)\\b')
+
 class QueryType(Enum):
     """Query type enumeration"""
     VECTOR = "vector"    # Use FAISS vector search
@@ -21,18 +33,70 @@ class RetrievalStrategy(Enum):
     VECTOR_FIRST = "vector_first"    # Vector primary, graph fallback  
     BALANCED_HYBRID = "balanced_hybrid"  # Equal weight to both
 
+class PatternSet:
+    """
+    Router patterns of one kind, matched with as few regex calls as possible.
+    Word-list patterns are fused into a single alternation scanned once with finditer; words are grouped
+    by the set of patterns containing them and each group is a named group, so m.lastgroup tells which
+    patterns a hit belongs to. The remaining patterns are searched one by one.
+    Assumes no listed word (or phrase) can match as a prefix or a suffix of another listed phrase,
+    since finditer reports only one, non-overlapping hit per position.
+    """
+    
+    def __init__(self, patterns: List[str], flags: int):
+        self.patterns = patterns
+        self.other_patterns = []
+        word_owners = {}
+        for i, pattern in enumerate(patterns):
+            word_list = _WORD_LIST_PATTERN_RE.fullmatch(pattern)
+            if word_list is None:
+                self.other_patterns.append((i, re.compile(pattern, flags)))
+                continue
+            for word in word_list.group(1).split('|'):
+                owners = word_owners.setdefault(word, [])
+                if i not in owners:
+                    owners.append(i)
+        
+        words_by_owners = {}
+        for word, owners in word_owners.items():
+            words_by_owners.setdefault(tuple(owners), []).append(word)
+        
+        self.group_owners = {}
+        alternatives = []
+        for j, (owners, words) in enumerate(words_by_owners.items()):
+            self.group_owners[f'w{j}'] = owners
+            alternatives.append(f"(?P<w{j}>{'|'.join(words)})")
+        self.word_regex = re.compile(r'\b(?:%s)\b' % '|'.join(alternatives), flags) if alternatives else None
+    
+    def matching(self, text: str, max_hits: Optional[int] = None) -> List[int]:
+        """Sorted indices of patterns found in text; once max_hits are known, remaining searches are skipped"""
+        hits = set()
+        if self.word_regex is not None:
+            for match in self.word_regex.finditer(text):
+                hits.update(self.group_owners[match.lastgroup])
+        for i, pattern in self.other_patterns:
+            if max_hits is not None and len(hits) >= max_hits:
+                break
+            if pattern.search(text):
+                hits.add(i)
+        return sorted(hits)
+
 class QueryRouter:
     """Routes queries to appropriate retrieval method"""
     
     def __init__(self):
         """Initialize query router with routing rules"""
         
+        # "A ... B" desenleri satır bazında yazılır: satır başından (^) ilk A'ya atomik grupla gidilir
+        # ((?>...) geri izlenmez), sonra son B aranır; \bA.*B ile aynı eşleşme, fakat uzun sorgularda
+        # karesel/kübik geri izleme yerine doğrusal süre
+        
         # Patterns that suggest graph-based retrieval (relationships, workflows)
         self.graph_patterns = [
             # Relationship queries
-            r'\b(?:how|nasıl).*(?:connect|bağlan|relate|ilişki|depend|bağımlı)\b',
-            r'\b(?:what|ne|hangi).*(?:affect|etkile|impact|sonuç|cause|neden)\b',
-            r'\b(?:which|hangi).*(?:require|gerektir|need|ihtiyaç|depend|bağımlı)\b',
+            r'^(?>[^\n]*?\b(?:how|nasıl))[^\n]*(?:connect|bağlan|relate|ilişki|depend|bağımlı)\b',
+            r'^(?>[^\n]*?\b(?:what|ne|hangi))[^\n]*(?:affect|etkile|impact|sonuç|cause|neden)\b',
+            r'^(?>[^\n]*?\b(?:which|hangi))[^\n]*(?:require|gerektir|need|ihtiyaç|depend|bağımlı)\b',
             
             # Workflow and process queries
             r'\b(?:step|adım|process|süreç|workflow|akış|procedure|prosedür)\b',
@@ -40,7 +104,7 @@ class QueryRouter:
             r'\b(?:order|sıra|sequence|dizi|flow|akış)\b',
             
             # Integration and setup queries
-            r'\b(?:integrate|entegre|setup|kurulum|configure|yapılandır|install|yükle)\b.*\b(?:with|ile|and|ve)\b',
+            r'^(?>[^\n]*?\b(?:integrate|entegre|setup|kurulum|configure|yapılandır|install|yükle)\b)[^\n]*\b(?:with|ile|and|ve)\b',
             r'\b(?:prerequisite|ön\s*koşul|requirement|gereksinim|dependency|bağımlılık)\b',
             
             # Multi-component queries
@@ -49,12 +113,12 @@ class QueryRouter:
             
             # Comparison and difference queries
             r'\b(?:difference|fark|farklar|karşılaştır|compare|comparison)\b',
-            r'\b(?:vs|versus|ile.*arasında|.*ile.*fark)\b',
-            r'\b(?:iOS.*Android|Android.*iOS)\b',
+            r'\b(?:vs|versus)\b|^(?>[^\n]*?\bile)[^\n]*arasında\b|^(?>[^\n]*?ile)[^\n]*fark\b',
+            r'^(?>[^\n]*?\biOS)[^\n]*Android\b|^(?>[^\n]*?\bAndroid)[^\n]*iOS\b',
             
             # Error and troubleshooting with context
-            r'\b(?:error|hata|problem|sorun|issue|mesele).*(?:when|zaman|while|iken|during|sırasında)\b',
-            r'\b(?:fix|düzelt|solve|çöz|resolve|çözümle).*(?:by|ile|using|kullanarak)\b',
+            r'^(?>[^\n]*?\b(?:error|hata|problem|sorun|issue|mesele))[^\n]*(?:when|zaman|while|iken|during|sırasında)\b',
+            r'^(?>[^\n]*?\b(?:fix|düzelt|solve|çöz|resolve|çözümle))[^\n]*(?:by|ile|using|kullanarak)\b',
         ]
         
         # Patterns that suggest vector-based retrieval (definitions, single concepts)
@@ -67,12 +131,12 @@ class QueryRouter:
             r'\b(?:parameter|parametre|setting|ayar|option|seçenek|value|değer)\b',
             r'\b(?:default|varsayılan|example|örnek|sample|numune)\b',
             
-            # Single feature queries
-            r'\b(?:feature|özellik|function|fonksiyon|capability|yetenek)\b\s*(?!.*\b(?:with|ile|and|ve|together|birlikte)\b)',
+            # Single feature queries (satırdaki son özellik kelimesinden sonra "with/ile/..." yoksa)
+            r'^(?>[^\n]*\b(?:feature|özellik|function|fonksiyon|capability|yetenek)\b)(?![^\n]*\b(?:with|ile|and|ve|together|birlikte)\b)',
             
             # Documentation lookup
             r'\b(?:documentation|dokümantasyon|guide|rehber|manual|kılavuz|reference|referans)\b',
-            r'\b(?:code|kod|example|örnek|snippet|parça)\b\s*(?!.*\b(?:integration|entegrasyon|setup|kurulum)\b)',
+            r'^(?>[^\n]*\b(?:code|kod|example|örnek|snippet|parça)\b)(?![^\n]*\b(?:integration|entegrasyon|setup|kurulum)\b)',
         ]
         
         # Keywords that strongly suggest graph retrieval
@@ -82,6 +146,9 @@ class QueryRouter:
             'prerequisite', 'önkoşul', 'requirement', 'gereksinim', 'process', 'süreç',
             'procedure', 'prosedür', 'flow', 'akış', 'connect', 'bağlan', 'relationship', 'ilişki'
         ]
+        # 'akış' hem workflow hem flow karşılığı olarak iki kez geçer; tekil tutulur, ağırlığı sayısı kadardır
+        self.graph_keyword_weights = Counter(self.graph_keywords)
+        self.graph_keywords = tuple(self.graph_keyword_weights)
         
         # Keywords that strongly suggest vector retrieval
         self.vector_keywords = [
@@ -90,17 +157,91 @@ class QueryRouter:
             'documentation', 'dokümantasyon', 'reference', 'referans', 'guide', 'rehber'
         ]
         
+        # Question words that suggest relationships
+        self.relationship_words = ['how', 'nasıl', 'why', 'neden', 'when', 'ne zaman', 'where', 'nerede']
+        
+        # Query openers that suggest a simple definition lookup (tuple: tek startswith çağrısı)
+        self.simple_starters = ('what is', 'nedir', 'what are', 'nelerdir', 'explain', 'açıkla')
+        
+        # Technical terms that indicate entities in the query
+        self.entity_indicators = [
+            'sdk', 'api', 'ios', 'android', 'gradle', 'push', 'notification',
+            'campaign', 'segment', 'analytics', 'netmera', 'config', 'setup',
+            'installation', 'integration', 'error', 'exception'
+        ]
+        
+        # Tüm anahtar kelime listeleri için tek otomat; sorgu bir kez taranır
+        self.keyword_matcher = MultiPatternMatcher(
+            (*self.graph_keywords, *self.vector_keywords, *self.relationship_words, *self.entity_indicators)
+        )
+        # Kelime -> (graph ağırlığı, vector, relationship, entity) etiketi; puanlama listeleri değil
+        # yalnızca sorguda bulunan kelimeleri dolaşır
+        self.keyword_tags = {
+            keyword: (
+                self.graph_keyword_weights.get(keyword, 0),
+                int(keyword in self.vector_keywords),
+                int(keyword in self.relationship_words),
+                int(keyword in self.entity_indicators),
+            )
+            for keyword in self.keyword_matcher.terms
+        }
+        
         # Compile regex patterns
-        self.compiled_graph_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in self.graph_patterns]
-        self.compiled_vector_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in self.vector_patterns]
+        # MULTILINE: satır bazlı desenlerde ^ her satır başında eşleşir
+        self.graph_pattern_set = PatternSet(self.graph_patterns, re.IGNORECASE | re.MULTILINE)
+        self.vector_pattern_set = PatternSet(self.vector_patterns, re.IGNORECASE | re.MULTILINE)
+        
+        # camelCase | PascalCase tek desende; ilk harf farklı olduğundan iki alternatif aynı kelimeyi sayamaz
+        self.entity_name_pattern = re.compile(r'\b[a-z]+[A-Z][a-zA-Z]*\b|\b[A-Z][a-z]+[A-Z][a-zA-Z]*\b')
+        
+        # Routing sadece normalize sorguya bağlı; tekrar eden sorgular yeniden puanlanmaz
+        self._route_cached = lru_cache(maxsize=QUERY_ANALYSIS_CACHE_SIZE)(self._route_normalized)
+    
+    def cache_clear(self) -> None:
+        """Drop memoized routing decisions (e.g. after changing patterns or keywords)"""
+        self._route_cached.cache_clear()
     
     def route_query(self, query: str) -> Dict[str, any]:
         """Route query with hybrid context merging strategy"""
-        query_lower = query.lower().strip()
-        
+        # Cache'teki sonuç paylaşılır; çağırana kopyası verilir
+        return dict(self._route_cached(query.lower().strip()))
+    
+    def _route_normalized(self, query_lower: str) -> Dict[str, any]:
+        """Uncached routing for a lowercased, stripped query"""
+        return self._route(query_lower, self._match_query(query_lower, max_pattern_hits=_SATURATING_PATTERN_HITS))
+    
+    def _match_query(self, query_lower: str, max_pattern_hits: Optional[int] = None) -> Dict[str, any]:
+        """
+        Keyword hits, entity count and matching pattern indices, computed once per query
+        (shared by scoring and get_routing_explanation).
+        With max_pattern_hits, each pattern sweep may stop once that many matches are known (enough for scoring).
+        """
+        keywords = self.keyword_matcher.find_all(query_lower)
+        keyword_hits = self._tally_keywords(keywords)
+        return {
+            'keywords': keywords,
+            'keyword_hits': keyword_hits,
+            'entity_count': self._count_entities_in_query(query_lower, keyword_hits['entity']),
+            'graph_patterns': self.graph_pattern_set.matching(query_lower, max_pattern_hits),
+            'vector_patterns': self.vector_pattern_set.matching(query_lower, max_pattern_hits),
+        }
+    
+    def _tally_keywords(self, found_keywords: Set[str]) -> Dict[str, int]:
+        """Weighted hit counts per keyword list for the keywords found in a query"""
+        graph = vector = relationship = entity = 0
+        for keyword in found_keywords:
+            graph_weight, is_vector, is_relationship, is_entity = self.keyword_tags[keyword]
+            graph += graph_weight
+            vector += is_vector
+            relationship += is_relationship
+            entity += is_entity
+        return {'graph': graph, 'vector': vector, 'relationship': relationship, 'entity': entity}
+    
+    def _route(self, query_lower: str, matches: Dict[str, any]) -> Dict[str, any]:
+        """Routing decision from precomputed matches"""
         # Calculate scores for each approach
-        graph_score = self._calculate_graph_score(query_lower)
-        vector_score = self._calculate_vector_score(query_lower)
+        graph_score = self._calculate_graph_score(query_lower, matches)
+        vector_score = self._calculate_vector_score(query_lower, matches)
         
         logger.debug(f"Query routing scores - Graph: {graph_score}, Vector: {vector_score}")
         
@@ -124,52 +265,53 @@ class QueryRouter:
             'reasoning': self._get_strategy_reasoning(strategy, graph_score, vector_score)
         }
     
-    def _calculate_graph_score(self, query: str) -> float:
-        """Calculate graph retrieval score"""
+    def _calculate_graph_score(self, query: str, matches: Dict[str, any]) -> float:
+        """Calculate graph retrieval score (matches: _match_query result for query)"""
         score = 0.0
+        keyword_hits = matches['keyword_hits']
         
         # Pattern matching
-        for pattern in self.compiled_graph_patterns:
-            if pattern.search(query):
-                score += 0.3
+        for _ in matches['graph_patterns']:
+            score += 0.3
+        if score >= 1.0:  # Skor yalnızca artar; tavana ulaşınca kalan kontroller sonucu değiştirmez
+            return 1.0
         
-        # Keyword matching
-        for keyword in self.graph_keywords:
-            if keyword in query:
-                score += 0.2
+        # Keyword matching (her isabet ayrı eklenir: toplam, liste döngüsündeki kayan nokta
+        # toplamıyla birebir aynı kalır ve +0.3 eşik karşılaştırmalarında karar değişmez)
+        for _ in range(keyword_hits['graph']):
+            score += 0.2
+        if score >= 1.0:
+            return 1.0
         
         # Multi-entity indicators
-        if self._count_entities_in_query(query) >= 2:
+        if matches['entity_count'] >= 2:
             score += 0.4
         
         # Question words that suggest relationships
-        relationship_words = ['how', 'nasıl', 'why', 'neden', 'when', 'ne zaman', 'where', 'nerede']
-        for word in relationship_words:
-            if word in query:
-                score += 0.1
+        for _ in range(keyword_hits['relationship']):
+            score += 0.1
         
         return min(score, 1.0)  # Cap at 1.0
     
-    def _calculate_vector_score(self, query: str) -> float:
-        """Calculate vector retrieval score"""
+    def _calculate_vector_score(self, query: str, matches: Dict[str, any]) -> float:
+        """Calculate vector retrieval score (matches: _match_query result for query)"""
         score = 0.0
         
         # Pattern matching
-        for pattern in self.compiled_vector_patterns:
-            if pattern.search(query):
-                score += 0.3
+        for _ in matches['vector_patterns']:
+            score += 0.3
+        if score >= 1.0:
+            return 1.0
         
         # Keyword matching
-        for keyword in self.vector_keywords:
-            if keyword in query:
-                score += 0.2
+        for _ in range(matches['keyword_hits']['vector']):
+            score += 0.2
+        if score >= 1.0:
+            return 1.0
         
         # Simple question indicators
-        simple_starters = ['what is', 'nedir', 'what are', 'nelerdir', 'explain', 'açıkla']
-        for starter in simple_starters:
-            if query.startswith(starter):
-                score += 0.4
-                break
+        if query.startswith(self.simple_starters):
+            score += 0.4
         
         # Single concept queries (short queries often want definitions)
         if len(query.split()) <= 4:
@@ -177,26 +319,15 @@ class QueryRouter:
         
         return min(score, 1.0)  # Cap at 1.0
     
-    def _count_entities_in_query(self, query: str) -> int:
-        """Count potential entities in query"""
+    def _count_entities_in_query(self, query: str, indicator_hits: int) -> int:
+        """Count potential entities in query (indicator_hits: entity indicators found by the keyword scan)"""
         # Simple heuristic: look for technical terms, camelCase, etc.
-        entity_indicators = [
-            'sdk', 'api', 'ios', 'android', 'gradle', 'push', 'notification',
-            'campaign', 'segment', 'analytics', 'netmera', 'config', 'setup',
-            'installation', 'integration', 'error', 'exception'
-        ]
-        
-        count = 0
-        for indicator in entity_indicators:
-            if indicator in query:
-                count += 1
+        count = indicator_hits
         
         # Look for camelCase or PascalCase (likely entity names)
-        camel_case_pattern = r'\b[a-z]+[A-Z][a-zA-Z]*\b'
-        pascal_case_pattern = r'\b[A-Z][a-z]+[A-Z][a-zA-Z]*\b'
-        
-        count += len(re.findall(camel_case_pattern, query))
-        count += len(re.findall(pascal_case_pattern, query))
+        # Desen büyük harf ister; küçük harfe çevrilmiş sorgularda (routing) tarama tamamen atlanır
+        if not query.islower():
+            count += len(self.entity_name_pattern.findall(query))
         
         return count
     
@@ -204,18 +335,13 @@ class QueryRouter:
         """Get detailed explanation of routing decision"""
         query_lower = query.lower().strip()
         
-        routing_result = self.route_query(query)
+        # Desenler bir kez aranır; hem karar hem açıklama aynı eşleşmeleri kullanır
+        matches = self._match_query(query_lower)
+        routing_result = self._route(query_lower, matches)
         
         # Find matching patterns
-        matching_graph_patterns = []
-        for i, pattern in enumerate(self.compiled_graph_patterns):
-            if pattern.search(query_lower):
-                matching_graph_patterns.append(self.graph_patterns[i])
-        
-        matching_vector_patterns = []
-        for i, pattern in enumerate(self.compiled_vector_patterns):
-            if pattern.search(query_lower):
-                matching_vector_patterns.append(self.vector_patterns[i])
+        matching_graph_patterns = [self.graph_patterns[i] for i in matches['graph_patterns']]
+        matching_vector_patterns = [self.vector_patterns[i] for i in matches['vector_patterns']]
         
         return {
             'query': query,
@@ -225,7 +351,7 @@ class QueryRouter:
             'vector_score': routing_result['vector_score'],
             'matching_graph_patterns': matching_graph_patterns,
             'matching_vector_patterns': matching_vector_patterns,
-            'entity_count': self._count_entities_in_query(query_lower),
+            'entity_count': matches['entity_count'],
             'reasoning': routing_result['reasoning']
         }
     
@@ -240,3 +366,15 @@ class QueryRouter:
         else:
             return "Unknown strategy"
 
+# Paylaşılan örnek: desenler ve anahtar kelime otomatı süreç başına bir kez kurulur, sorgu cache'i ortak kullanılır
+_default_router: Optional[QueryRouter] = None
+_default_router_lock = threading.Lock()
+
+def get_router() -> QueryRouter:
+    """Process-wide QueryRouter; use this instead of constructing one per request"""
+    global _default_router
+    if _default_router is None:
+        with _default_router_lock:
+            if _default_router is None:
+                _default_router = QueryRouter()
+    return _default_router
@@ -4,10 +4,27 @@ Addresses query expansion, dynamic K selection, and better chunk ranking
 """
 
 import re
+import heapq
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from operator import itemgetter
 from typing import List, Dict, Tuple, Any, Optional
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 from langchain_community.vectorstores import FAISS
 import os
+import numpy as np
+
+# Script olarak da çalışır (python src/improved_retrieval_system.py): src/ paketi yoksa yan modülden al
+try:
+    from src.multi_pattern import MultiPatternMatcher
+except ImportError:
+    from multi_pattern import MultiPatternMatcher
+
+# Sorgu -> intent skorları (LRU); graphrag routing/expansion önbellekleriyle aynı ortam değişkeni
+QUERY_ANALYSIS_CACHE_SIZE = int(os.getenv("QUERY_ANALYSIS_CACHE_SIZE", "4096"))
+# Sorgu metni -> float32 embedding (LRU)
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
 
 class ImprovedRetrievalSystem:
     """Enhanced retrieval system with query expansion and dynamic K selection"""
@@ -17,6 +34,12 @@ class ImprovedRetrievalSystem:
         self.embeddings = OpenAIEmbeddings()
         self.llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.1)
         self.vectorstore = None
+        # Docstore id -> (küçük harfli içerik, küçük harfli kaynak); aynı chunk'lar sorgular arasında tekrar gelir
+        self._lowered_docs: Dict[str, Tuple[str, str]] = {}
+        self._reload_lock = threading.Lock()
+        # Sorgu metni -> float32 embedding (LRU); genişletilmiş sorgu şablonları ve tekrar eden sorgular yeniden embed edilmez
+        self._embedding_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._embedding_lock = threading.Lock()
         self.load_vectorstore()
         
         # Query patterns and their enhancements
@@ -47,16 +70,47 @@ class ImprovedRetrievalSystem:
                 "context": "API documentation and usage"
             }
         }
+        
+        # Rerank sırasında doküman içeriğinde aranan intent terimleri
+        self.rerank_terms = {
+            "platform": ("ios", "android", "react native", "flutter", "unity", "web", "mobile", "platform"),
+            "integration": ("setup", "install", "implement", "sdk", "integration", "kurulum"),
+            "features": ("push", "notification", "analytics", "segment", "campaign", "automation"),
+        }
+        
+        # Tüm intent anahtar kelimeleri tek otomatta; sorgu bir kez taranır ve alt dizi eşleşmesi
+        # korunur ("platform" -> "platformları"). Her intent bulunan kümeyle kesiştirilir.
+        self.intent_keyword_sets = {intent: frozenset(config["keywords"]) for intent, config in self.query_patterns.items()}
+        self.intent_keyword_matcher = MultiPatternMatcher(
+            keyword for config in self.query_patterns.values() for keyword in config["keywords"]
+        )
+        
+        # Intent skorları yalnızca küçük harfli sorguya bağlı; tekrar eden sorgular yeniden taranmaz
+        self._intent_scores = lru_cache(maxsize=QUERY_ANALYSIS_CACHE_SIZE)(self._score_intents)
+    
+    def cache_clear(self):
+        """Drop memoized intent scores (e.g. after changing query_patterns), lowercased documents and query embeddings"""
+        self._intent_scores.cache_clear()
+        self._lowered_docs.clear()
+        with self._embedding_lock:
+            self._embedding_cache.clear()
     
     def load_vectorstore(self):
-        """Load FAISS vectorstore"""
+        """
+        Load FAISS vectorstore.
+        Searches only read the index, so concurrent queries are safe; a reload builds the new store first
+        and then swaps it in together with a fresh lowercase cache, never mutating the store in use.
+        """
         try:
             if os.path.exists(self.faiss_store_path):
-                self.vectorstore = FAISS.load_local(
+                vectorstore = FAISS.load_local(
                     self.faiss_store_path, 
                     self.embeddings, 
                     allow_dangerous_deserialization=True
                 )
+                with self._reload_lock:
+                    self.vectorstore = vectorstore
+                    self._lowered_docs = {}  # Yeni store'da aynı id farklı içerik taşıyabilir
                 print(f"✅ FAISS vectorstore loaded from {self.faiss_store_path}")
             else:
                 print(f"❌ FAISS vectorstore not found at {self.faiss_store_path}")
@@ -65,26 +119,32 @@ class ImprovedRetrievalSystem:
     
     def detect_query_intent(self, query: str) -> Dict[str, Any]:
         """Detect query intent and suggest enhancements"""
-        query_lower = query.lower()
+        # Cache'te (intent, confidence) çiftleri tutulur; dönen dict'ler her çağrıda yeni oluşturulur
+        detected_intents = [
+            {"intent": intent, "confidence": confidence, "config": self.query_patterns[intent]}
+            for intent, confidence in self._intent_scores(query.lower())
+        ]
+        
+        return {
+            "primary_intent": detected_intents[0] if detected_intents else None,
+            "all_intents": detected_intents,
+            "needs_expansion": len(detected_intents) > 0
+        }
+    
+    def _score_intents(self, query_lower: str) -> Tuple[Tuple[str, float], ...]:
+        """(intent, confidence) pairs for a lowercased query, highest confidence first (uncached)"""
         detected_intents = []
+        found_keywords = self.intent_keyword_matcher.find_all(query_lower)
         
         for intent, config in self.query_patterns.items():
-            keyword_matches = sum(1 for keyword in config["keywords"] if keyword in query_lower)
+            keyword_matches = len(self.intent_keyword_sets[intent] & found_keywords)
             if keyword_matches > 0:
-                detected_intents.append({
-                    "intent": intent,
-                    "confidence": keyword_matches / len(config["keywords"]),
-                    "config": config
-                })
+                detected_intents.append((intent, keyword_matches / len(config["keywords"])))
         
         # Sort by confidence
-        detected_intents.sort(key=lambda x: x["confidence"], reverse=True)
+        detected_intents.sort(key=lambda x: x[1], reverse=True)
         
-        return {
-            "primary_intent": detected_intents[0] if detected_intents else None,
-            "all_intents": detected_intents,
-            "needs_expansion": len(detected_intents) > 0
-        }
+        return tuple(detected_intents)
     
     def expand_query(self, query: str, intent_info: Dict) -> List[str]:
         """Expand query with related terms and context"""
@@ -148,33 +208,74 @@ class ImprovedRetrievalSystem:
         
         return min(base_k, 10)  # Cap at 10
     
+    def _embed_queries(self, queries: List[str]) -> List[np.ndarray]:
+        """Embeddings for queries; cached ones are reused and the rest are fetched in one embed_documents call"""
+        with self._embedding_lock:
+            vectors = [self._embedding_cache.get(query) for query in queries]
+            for query, vector in zip(queries, vectors):
+                if vector is not None:
+                    self._embedding_cache.move_to_end(query)
+        
+        missing = list(dict.fromkeys(query for query, vector in zip(queries, vectors) if vector is None))
+        if not missing:
+            return vectors
+        
+        # FAISS araması float32 ile yapılır; vektörler bu tipte saklanır (liste halinin ~1/6'sı bellek)
+        fetched = {
+            query: np.asarray(vector, dtype="float32")
+            for query, vector in zip(missing, self.embeddings.embed_documents(missing))
+        }
+        with self._embedding_lock:
+            self._embedding_cache.update(fetched)
+            while len(self._embedding_cache) > QUERY_EMBEDDING_CACHE_SIZE:
+                self._embedding_cache.popitem(last=False)
+        
+        return [vector if vector is not None else fetched[query] for query, vector in zip(queries, vectors)]
+    
     def retrieve_with_multiple_queries(self, queries: List[str], k: int) -> List[Tuple[Any, float]]:
         """Retrieve documents using multiple query variations"""
         if not self.vectorstore:
             return []
         
         all_results = []
-        seen_content = set()
+        seen_ids = set()
         
-        for query in queries:
+        # Cache'te olmayan sorgu varyasyonları tek embedding isteğinde; FAISS araması vektörle yapılır
+        try:
+            query_vectors = self._embed_queries(queries)
+        except Exception as e:
+            print(f"⚠️ Error embedding queries: {e}")
+            return []
+        
+        for query, vector in zip(queries, query_vectors):
             try:
-                results = self.vectorstore.similarity_search_with_score(query, k=k)
+                results = self.vectorstore.similarity_search_with_score_by_vector(vector, k=k)
                 
                 for doc, score in results:
-                    content_hash = hash(doc.page_content[:200])  # Use first 200 chars as identifier
+                    # Docstore id as identifier; the docstore returns the same Document object per id,
+                    # so stores saved without ids fall back to object identity
+                    doc_id = doc.id or id(doc)
                     
-                    if content_hash not in seen_content:
-                        seen_content.add(content_hash)
+                    if doc_id not in seen_ids:
+                        seen_ids.add(doc_id)
                         all_results.append((doc, score, query))  # Include which query found it
                         
             except Exception as e:
                 print(f"⚠️ Error in query '{query}': {e}")
                 continue
         
-        # Sort by score (lower is better for FAISS)
-        all_results.sort(key=lambda x: x[1])
-        
-        return all_results[:k*2]  # Return up to 2*k results
+        # Best 2*k by score (lower is better for FAISS); same order as a stable sort + slice
+        return heapq.nsmallest(k * 2, all_results, key=itemgetter(1))
+    
+    def _lowered(self, doc: Any) -> Tuple[str, str]:
+        """Lowercased page content and source of doc, cached per docstore id"""
+        cache = self._lowered_docs  # Reload sırasında eski store'un girdisi yeni cache'e yazılmaz
+        lowered = cache.get(doc.id) if doc.id else None
+        if lowered is None:
+            lowered = (doc.page_content.lower(), doc.metadata.get("source", "").lower())
+            if doc.id:
+                cache[doc.id] = lowered
+        return lowered
     
     def rerank_results(self, results: List[Tuple[Any, float, str]], 
                       original_query: str, intent_info: Dict) -> List[Tuple[Any, float]]:
@@ -184,41 +285,43 @@ class ImprovedRetrievalSystem:
         
         scored_results = []
         
+        # Sorguya bağlı kontroller doküman döngüsünden önce bir kez yapılır
+        intent = intent_info["primary_intent"]["intent"] if intent_info["primary_intent"] else None
+        query_lower = original_query.lower()
+        is_api_query = "api" in query_lower
+        is_howto_query = any(word in query_lower for word in ["nasıl", "how", "adım", "step"])
+        is_platform_query = "platform" in query_lower
+        
         for doc, original_score, found_by_query in results:
-            content = doc.page_content.lower()
+            content, source = self._lowered(doc)
             metadata = doc.metadata
             
             # Start with original similarity score (invert so higher is better)
             relevance_score = 1.0 / (1.0 + original_score)
             
             # Boost based on intent matching
-            if intent_info["primary_intent"]:
-                intent = intent_info["primary_intent"]["intent"]
-                
+            if intent:
                 if intent == "platform":
-                    platform_terms = ["ios", "android", "react native", "flutter", "unity", "web", "mobile", "platform"]
-                    platform_matches = sum(1 for term in platform_terms if term in content)
+                    platform_matches = sum(1 for term in self.rerank_terms["platform"] if term in content)
                     relevance_score += platform_matches * 0.3
                     
                     # Boost developer guide content for platform questions
-                    if "developer" in metadata.get("source", "").lower():
+                    if "developer" in source:
                         relevance_score += 0.4
                 
                 elif intent == "integration":
-                    integration_terms = ["setup", "install", "implement", "sdk", "integration", "kurulum"]
-                    integration_matches = sum(1 for term in integration_terms if term in content)
+                    integration_matches = sum(1 for term in self.rerank_terms["integration"] if term in content)
                     relevance_score += integration_matches * 0.2
                 
                 elif intent == "features":
-                    feature_terms = ["push", "notification", "analytics", "segment", "campaign", "automation"]
-                    feature_matches = sum(1 for term in feature_terms if term in content)
+                    feature_matches = sum(1 for term in self.rerank_terms["features"] if term in content)
                     relevance_score += feature_matches * 0.2
             
             # Boost based on content type
             content_type = metadata.get("content_type", "")
-            if content_type == "api" and "api" in original_query.lower():
+            if content_type == "api" and is_api_query:
                 relevance_score += 0.3
-            elif content_type == "tutorial" and any(word in original_query.lower() for word in ["nasıl", "how", "adım", "step"]):
+            elif content_type == "tutorial" and is_howto_query:
                 relevance_score += 0.3
             
             # Boost enhanced chunks (they have better context)
@@ -226,8 +329,7 @@ class ImprovedRetrievalSystem:
                 relevance_score += 0.2
             
             # Penalize if source doesn't seem relevant
-            source = metadata.get("source", "").lower()
-            if "platform" in original_query.lower() and "iys" in source:
+            if is_platform_query and "iys" in source:
                 relevance_score -= 0.4  # IYS is not relevant for platform questions
             
             scored_results.append((doc, relevance_score, original_score, found_by_query))
@@ -324,13 +426,28 @@ class ImprovedRetrievalSystem:
             print()
 
 
+# Store yolu başına tek örnek: FAISS index'i ve OpenAI client'ları süreç başına bir kez yüklenir
+_retrieval_systems: Dict[str, ImprovedRetrievalSystem] = {}
+_retrieval_systems_lock = threading.Lock()
+
+def get_retrieval_system(faiss_store_path: str = "data/embeddings/faiss_store") -> ImprovedRetrievalSystem:
+    """Shared ImprovedRetrievalSystem for faiss_store_path (created on first use)"""
+    system = _retrieval_systems.get(faiss_store_path)
+    if system is None:
+        with _retrieval_systems_lock:
+            system = _retrieval_systems.get(faiss_store_path)
+            if system is None:
+                system = _retrieval_systems[faiss_store_path] = ImprovedRetrievalSystem(faiss_store_path)
+    return system
+
+
 def integrate_improved_retrieval():
     """Integrate improved retrieval into existing system"""
     
     print("🔧 Integrating Improved Retrieval System...")
     
     # Test the system
-    retrieval_system = ImprovedRetrievalSystem()
+    retrieval_system = get_retrieval_system()
     
     if retrieval_system.vectorstore:
         print("✅ System ready for testing")
@@ -0,0 +1,56 @@
+"""
+Multi-pattern substring matching for fixed term lists.
+Uses an Aho-Corasick automaton (pyahocorasick) when available and falls back
+to a single compiled regex otherwise; both report every occurrence, including
+overlapping and nested terms, in one pass over the text.
+"""
+
+import re
+from typing import Iterable, Iterator, Set, Tuple
+
+try:
+    import ahocorasick
+    HAS_AHOCORASICK = True
+except ImportError:
+    HAS_AHOCORASICK = False
+
+class MultiPatternMatcher:
+    """Finds all occurrences of a fixed set of terms in one linear scan"""
+
+    def __init__(self, terms: Iterable[str]):
+        self.terms = tuple(dict.fromkeys(term for term in terms if term))
+
+        self._automaton = None
+        self._regex = None
+        if not self.terms:
+            return
+
+        if HAS_AHOCORASICK:
+            self._automaton = ahocorasick.Automaton()
+            for term in self.terms:
+                self._automaton.add_word(term, term)
+            self._automaton.make_automaton()
+        else:
+            # Lookahead her pozisyonda en uzun terimi yakalar (uzunluğa göre sıralı alternation);
+            # aynı pozisyondan başlayan daha kısa terimler o terimin önekleridir
+            longest_first = sorted(self.terms, key=len, reverse=True)
+            self._regex = re.compile("(?=(%s))" % "|".join(map(re.escape, longest_first)))
+            self._prefixes = {
+                term: tuple(other for other in self.terms if term.startswith(other))
+                for term in self.terms
+            }
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        """Yield (start, term) for every occurrence of every term in text"""
+        if self._automaton is not None:
+            for end, term in self._automaton.iter(text):
+                yield end - len(term) + 1, term
+        elif self._regex is not None:
+            for match in self._regex.finditer(text):
+                start = match.start()
+                for term in self._prefixes[match.group(1)]:
+                    yield start, term
+
+    def find_all(self, text: str) -> Set[str]:
+        """Return the set of terms that occur in text"""
+        return {term for _, term in self.iter_matches(text)}
@@ -151,6 +151,18 @@ class QueryEnhancer:
         
         return " ".join(cleaned_words)
 
+# Turkish-English mapping for enhanced_preprocess_query
+_TR_EN_MAP = {
+    "push bildirimi": "push notification",
+    "itme bildirim": "push notification", 
+    "segment": "user segment",
+    "kampanya": "campaign",
+    "analitik": "analytics",
+    "otomasyon": "automation",
+    "yolculuk": "journey",
+    "entegrasyon": "integration"
+}
+
 # Integration with existing preprocess_query function
 def enhanced_preprocess_query(query: str, lang: str) -> str:
     """
@@ -161,20 +173,11 @@ def enhanced_preprocess_query(query: str, lang: str) -> str:
     # Apply existing logic
     enhanced_query = query
     
-    # Turkish-English mapping (existing logic)
-    tr_en_map = {
-        "push bildirimi": "push notification",
-        "itme bildirim": "push notification", 
-        "segment": "user segment",
-        "kampanya": "campaign",
-        "analitik": "analytics",
-        "otomasyon": "automation",
-        "yolculuk": "journey",
-        "entegrasyon": "integration"
-    }
-    
-    for tr_term, en_term in tr_en_map.items():
-        if tr_term in enhanced_query.lower():
+    # Turkish-English mapping (existing logic). Eklenen İngilizce terimler hiçbir Türkçe anahtarı
+    # içermediği için kontrol, her adımda büyüyen sorguyu tekrar küçültmek yerine orijinal sorguya yapılır
+    query_lower = query.lower()
+    for tr_term, en_term in _TR_EN_MAP.items():
+        if tr_term in query_lower:
             enhanced_query += f" {en_term}"
     
     # Apply new enhancement
@@ -1,4 +1,4 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Sequence
 import numpy as np
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import FAISS
@@ -41,7 +41,18 @@ class HybridRetriever:
 
         return BM25_WEIGHT*bm25_norm + FAISS_WEIGHT*faiss_sim + FUZZY_WEIGHT*fuzzy
 
-    def retrieve(self, query: str, k: int = 6):
+    def _embed_queries(self, queries: List[str], query_vector: Optional[Sequence[float]] = None) -> List[Sequence[float]]:
+        """Tüm sorgular tek embedding isteğinde; ilk sorgunun (orijinal) hazır vektörü varsa o yeniden embed edilmez"""
+        if query_vector is None:
+            return self.emb.embed_documents(queries)
+        rest = self.emb.embed_documents(queries[1:]) if len(queries) > 1 else []
+        return [query_vector] + rest
+
+    def retrieve(self, query: str, k: int = 6, query_vector: Optional[Sequence[float]] = None):
+        """
+        Hybrid (BM25 + FAISS + fuzzy) retrieval; sonuçlar "score"a göre azalan sırada döner.
+        query_vector: query'nin önceden hesaplanmış embedding'i (verilirse tekrar embed edilmez)
+        """
         # Enhanced query processing
         enhancement = self.query_enhancer.enhance_query_for_retrieval(query)
         query_type = enhancement['query_type']
@@ -57,9 +68,15 @@ class HybridRetriever:
         all_faiss_docs = []
         seen_content = set()
         
-        for expanded_query in expanded_queries:
+        try:
+            query_vectors = self._embed_queries(expanded_queries, query_vector)
+        except Exception as e:
+            print(f"⚠️ Error embedding expanded queries: {e}")
+            query_vectors = []
+        
+        for expanded_query, vector in zip(expanded_queries, query_vectors):
             try:
-                faiss_docs = self.vs.similarity_search_with_score(expanded_query, k=faiss_k)
+                faiss_docs = self.vs.similarity_search_with_score_by_vector(vector, k=faiss_k)
                 
                 for doc, sim in faiss_docs:
                     # Use first 100 chars as unique identifier
@@ -3,13 +3,15 @@ Hybrid retriever combining FAISS vector search with GraphRAG knowledge graph ret
 """
 
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 from dataclasses import dataclass
 from ..graphrag.graph_store import NetmeraGraphStore
 from ..graphrag.graph_retriever import GraphRAGRetriever
-from ..graphrag.query_router import QueryRouter, QueryType, RetrievalStrategy
-from ..graphrag.query_expansion import QueryExpander, ExpandedQuery
+from ..graphrag.query_router import QueryType, RetrievalStrategy, get_router
+from ..graphrag.query_expansion import ExpandedQuery, get_expander
 from .hybrid import HybridRetriever
+from ..context_compaction import compact_document
+from ..config import CONTEXT_DOC_MAX_CHARS
 
 logger = logging.getLogger(__name__)
 
@@ -40,8 +42,8 @@ class HybridGraphRAGRetriever:
         # Initialize GraphRAG components
         self.graph_store = NetmeraGraphStore()
         self.graph_retriever = GraphRAGRetriever(self.graph_store)
-        self.query_router = QueryRouter()
-        self.query_expander = QueryExpander()  # NEW: Query expansion
+        self.query_router = get_router()
+        self.query_expander = get_expander()  # NEW: Query expansion
         
         # Configuration for query expansion
         self.enable_query_expansion = True
@@ -55,7 +57,7 @@ class HybridGraphRAGRetriever:
         
         logger.info(f"Hybrid GraphRAG retriever initialized with {self.graph_store.graph.number_of_nodes()} graph nodes and query expansion")
     
-    def retrieve(self, query: str, k: int = 5) -> HybridGraphRAGContext:
+    def retrieve(self, query: str, k: int = 5, query_vector: Optional[Sequence[float]] = None) -> HybridGraphRAGContext:
         """
         Retrieve context using hybrid context merging approach with automatic query expansion.
         Always fetches both vector and graph contexts, with intelligent prioritization.
@@ -63,6 +65,7 @@ class HybridGraphRAGRetriever:
         Args:
             query: User query
             k: Number of documents to retrieve
+            query_vector: Precomputed embedding of query (skips re-embedding in the vector retriever)
             
         Returns:
             Combined context from both retrievers with source tracking and expansion
@@ -76,7 +79,7 @@ class HybridGraphRAGRetriever:
         logger.info(f"Query strategy: {strategy.value}")
         
         # Step 2: Initial retrieval with original query
-        vector_context, graph_context = self._retrieve_contexts(query, k)
+        vector_context, graph_context = self._retrieve_contexts(query, k, query_vector)
         
         # Step 3: Assess if query expansion is needed
         expansion_used = None
@@ -201,7 +204,8 @@ class HybridGraphRAGRetriever:
                 formatted_parts.append(f"--- SOURCE {i} (score: {doc.get('score', 0):.2f}) ---")
                 formatted_parts.append(f"Type: {doc.get('source_type', 'documentation')}")
                 formatted_parts.append(f"URL: {doc.get('url', 'unknown')}")
-                formatted_parts.append(f"Content: {doc.get('text', '')[:800]}...")  # Limit content
+                content = compact_document(doc.get('text', ''), query, CONTEXT_DOC_MAX_CHARS)  # Limit content
+                formatted_parts.append(f"Content: {content}...")
                 formatted_parts.append("")
         
         # Add usage instructions
@@ -217,14 +221,15 @@ class HybridGraphRAGRetriever:
         
         return "\n".join(formatted_parts)
     
-    def _retrieve_contexts(self, query: str, k: int) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    def _retrieve_contexts(self, query: str, k: int, query_vector: Optional[Sequence[float]] = None
+                           ) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
         """Retrieve both vector and graph contexts for a given query"""
         vector_context = []
         graph_context = None
         
         # Fetch vector context
         try:
-            vector_docs = self.vector_retriever.retrieve(query, k=k)
+            vector_docs = self.vector_retriever.retrieve(query, k=k, query_vector=query_vector)
             vector_context = [
                 {
                     "text": doc.get("text", ""),
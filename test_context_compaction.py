@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Test query-aware document compaction used when building LLM context
+"""
+
+from src.context_compaction import compact_document
+
+DOC = "\n".join(
+    ["Android SDK Integration"]
+    + [f"General note {i} about dashboards and reports." for i in range(30)]
+    + [
+        "Push notification permission on Android 13 requires POST_NOTIFICATIONS.",
+        "```kotlin",
+        "Netmera.requestPushPermission()",
+        "```",
+        "Call it after the user opts in to push notification.",
+    ]
+    + [f"Footer line {i} about billing." for i in range(30)]
+)
+
+def test_compaction_keeps_relevant_passage():
+    """Relevant passage and heading survive, budget is respected"""
+    print("✂️ Context Compaction Test")
+    print("=" * 50)
+
+    compact = compact_document(DOC, "Android push notification permission nasıl", max_chars=400)
+    print(compact)
+
+    assert len(compact) <= 400
+    assert compact.startswith("Android SDK Integration\n...\n")
+    assert "POST_NOTIFICATIONS" in compact
+    assert "```kotlin\nNetmera.requestPushPermission()\n```" in compact  # Kod bloğu bölünmez
+    assert "General note" not in compact               # Önceki ilgisiz satırlar atlanır
+
+def test_compaction_fallbacks():
+    """Short docs untouched; no overlap -> prefix cut; 0 disables"""
+    print("\n📏 Compaction Fallback Test")
+    print("=" * 50)
+
+    assert compact_document("  short doc  ", "anything", max_chars=800) == "short doc"
+    assert compact_document(DOC, "unrelated query words", max_chars=120) == DOC[:120]
+    assert compact_document(DOC, "push", max_chars=0) == DOC
+
+if __name__ == "__main__":
+    test_compaction_keeps_relevant_passage()
+    test_compaction_fallbacks()
+    print("\n✅ Context compaction tests completed!")
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Test regex/known-term entity extraction and overlap removal
+"""
+
+from src.graphrag.entity_extractor import EntityExtractor
+
+def test_entity_extraction():
+    """Pattern matches carry their entity type; known terms win overlaps"""
+    print("🔎 Entity Extraction Test")
+    print("=" * 50)
+
+    extractor = EntityExtractor()
+    text = "Install the iOS SDK, then configure push notifications and the API key"
+    entities = extractor.extract_entities(text)
+
+    for entity in entities:
+        print(f"{entity.entity_type:15} {entity.text!r} ({entity.confidence}) @{entity.start_pos}")
+
+    found = {(e.text, e.entity_type, e.confidence) for e in entities}
+    assert ("iOS SDK", "SDK", 0.9) in found            # Bilinen terim, "iOS" platformunu bastırır
+    assert ("Install", "Procedure", 0.7) in found
+    assert ("configure", "Procedure", 0.7) in found
+    assert ("push notifications", "Feature", 0.9) in found
+    assert ("API", "API", 0.7) in found                # "API key" ile örtüşür, ilk pattern kazanır
+
+    for entity in entities:
+        assert text[entity.start_pos:entity.end_pos] == entity.text
+
+    spans = sorted((e.start_pos, e.end_pos) for e in entities)
+    assert all(prev[1] <= cur[0] for prev, cur in zip(spans, spans[1:]))
+
+    # 'İ' küçük harfe çevrilince iki karakter olur; pozisyonlar kaymamalı
+    turkish = "İçin önce İOS SDK, sonra Android SDK kurulur"
+    texts = {e.text for e in extractor.extract_entities(turkish)}
+    print(f"Turkish: {texts}")
+    assert texts == {"İOS SDK", "Android SDK"}
+
+def test_relationship_extraction():
+    """Relation keywords between nearby entities; far-apart pairs are skipped"""
+    print("\n🔗 Relationship Extraction Test")
+    print("=" * 50)
+
+    extractor = EntityExtractor()
+    text = "The Android SDK requires Gradle and includes push notifications. " + "x" * 120 + " Flutter uses Web"
+    entities = extractor.extract_entities(text)
+    relationships = extractor.extract_relationships(text, entities)
+
+    for relation in relationships:
+        print(relation)
+
+    assert ("Android SDK", "Gradle", "requires") in relationships
+    assert ("Gradle", "push notifications", "implements") in relationships
+    assert ("Gradle", "push notifications", "contains") in relationships  # "includes" iki tipte de var
+    assert ("Flutter", "Web", "uses") in relationships
+    assert not any(source == "Android SDK" and target in ("Flutter", "Web") for source, target, _ in relationships)
+
+if __name__ == "__main__":
+    test_entity_extraction()
+    test_relationship_extraction()
+    print("\n✅ Entity extractor tests completed!")
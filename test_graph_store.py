@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test knowledge graph traversal and search on the sample Netmera graph
+"""
+
+import os
+import tempfile
+
+from src.graphrag.graph_store import NetmeraGraphStore
+from src.graphrag.graph_retriever import GraphRAGRetriever
+
+def _sample_store() -> NetmeraGraphStore:
+    """Sample graph in a temp file (data/graph is left untouched)"""
+    path = os.path.join(tempfile.mkdtemp(), "graph.pkl")
+    store = NetmeraGraphStore(graph_path=path)
+    store.build_sample_graph()
+    return store
+
+def test_multi_source_traversal():
+    """One BFS from all seeds gives min hop distance and owning seed"""
+    print("🕸️ Multi-Source Traversal Test")
+    print("=" * 50)
+
+    store = _sample_store()
+    reached = store.multi_source_neighbors(["netmera_sdk", "push_notification", "missing"], max_hops=2)
+    print(f"Reached: {reached}")
+
+    assert list(reached)[:2] == ["netmera_sdk", "push_notification"]
+    assert "missing" not in reached
+    assert reached["push_notification"] == (0, "push_notification")  # Seed, netmera_sdk komşusu olsa da
+    assert reached["campaign_api"] == (1, "push_notification")
+    assert reached["gradle_config"] == (2, "netmera_sdk")
+    assert store.multi_source_neighbors(["netmera_sdk"], max_hops=0) == {"netmera_sdk": (0, "netmera_sdk")}
+
+    single = {n["entity_id"] for n in store.get_neighbors("netmera_sdk", max_hops=2)}
+    assert single == set(store.multi_source_neighbors(["netmera_sdk"], max_hops=2)) - {"netmera_sdk"}
+    assert set(store.get_subgraph(["android_platform"], max_hops=1).nodes) == {"android_platform", "gradle_config"}
+
+def test_search_entities():
+    """Index-backed search keeps substring semantics, scoring and graph order"""
+    print("\n🔤 Entity Search Test")
+    print("=" * 50)
+
+    store = _sample_store()
+    matches = store.search_entities("android", limit=3)
+    print(f"'android' -> {[(m['entity_id'], m['match_score']) for m in matches]}")
+    assert [(m["entity_id"], m["match_score"]) for m in matches] == [("android_platform", 15), ("gradle_config", 5)]
+
+    assert [m["entity_id"] for m in store.search_entities("sh notif")] == ["push_notification"]  # Kelime ortası
+    assert store.search_entities("zzz") == []
+    assert len(store.search_entities("", limit=100)) == store.graph.number_of_nodes()
+
+    # Yeni eklenen ve diskten yüklenen graph'ta da bulunur
+    from src.graphrag.graph_store import Entity
+    store.add_entity(Entity("huawei_platform", "Huawei", "Platform", "Huawei HMS platform", {}))
+    assert store.search_entities("hms")[0]["entity_id"] == "huawei_platform"
+    store.save_graph()
+    assert NetmeraGraphStore(graph_path=store.graph_path).search_entities("hms")[0]["entity_id"] == "huawei_platform"
+
+def test_graph_persistence():
+    """Compressed save round-trips; legacy plain pickles still load"""
+    print("\n💾 Graph Persistence Test")
+    print("=" * 50)
+
+    import pickle
+    from src.graphrag.graph_store import HAS_ZSTD
+
+    store = _sample_store()
+    with open(store.graph_path, "rb") as f:
+        print(f"Header: {f.read(5)!r} (zstd: {HAS_ZSTD})")
+
+    loaded = NetmeraGraphStore(graph_path=store.graph_path)
+    assert sorted(loaded.graph.edges(keys=True, data=True)) == sorted(store.graph.edges(keys=True, data=True))
+    assert dict(loaded.graph.nodes(data=True)) == dict(store.graph.nodes(data=True))
+
+    legacy_path = store.graph_path + ".legacy"
+    with open(legacy_path, "wb") as f:
+        pickle.dump(store.graph, f)
+    legacy = NetmeraGraphStore(graph_path=legacy_path)
+    assert legacy.get_stats() == store.get_stats()
+    assert legacy.search_entities("android")[0]["entity_id"] == "android_platform"
+
+def test_graph_retrieval():
+    """Anchors come first with hop 0; relationships link anchors to retrieved entities"""
+    print("\n🔎 Graph Retrieval Test")
+    print("=" * 50)
+
+    retriever = GraphRAGRetriever(_sample_store())
+    context = retriever.retrieve("Android push notification", max_entities=5, max_hops=1)
+    print(context.subgraph_info)
+
+    ids = [e["entity_id"] for e in context.entities]
+    assert len(ids) == len(set(ids))
+    assert {"android_platform", "push_notification"} <= set(ids)
+    hops = [e["hop_distance"] for e in context.entities]
+    assert hops == sorted(hops)
+    rels = {(r["source_id"], r["relation_type"], r["target_id"]) for r in context.relationships}
+    assert ("android_platform", "requires", "gradle_config") in rels
+    assert ("push_notification", "uses", "campaign_api") in rels
+    assert 0 < context.confidence <= 1
+
+    # Aynı entity'ye giden tekrar eden ifadeler tek anchor olur
+    seen_ids = set()
+    anchors = retriever._extract_anchor_entities("Android push notification, android ANDROID push", seen_ids)
+    assert [a["entity_id"] for a in anchors] == ["android_platform", "push_notification"]
+    assert seen_ids == {"android_platform", "push_notification"}
+
+    # Aynı sorgu cache'ten gelir; graph değişince yeniden hesaplanır
+    assert retriever.retrieve("Android push notification", max_entities=5, max_hops=1) is context
+    from src.graphrag.graph_store import Relationship
+    retriever.graph_store.add_relationship(Relationship("android_platform", "push_notification", "supports", "", {}))
+    refreshed = retriever.retrieve("Android push notification", max_entities=5, max_hops=1)
+    assert refreshed is not context
+    assert ("android_platform", "supports", "push_notification") in {
+        (r["source_id"], r["relation_type"], r["target_id"]) for r in refreshed.relationships
+    }
+
+if __name__ == "__main__":
+    test_multi_source_traversal()
+    test_search_entities()
+    test_graph_persistence()
+    test_graph_retrieval()
+    print("\n✅ Graph store tests completed!")
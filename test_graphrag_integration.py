@@ -4,6 +4,7 @@ Test script for GraphRAG integration
 
 import os
 import sys
+import tempfile
 sys.path.append('src')
 
 def test_graphrag_components():
@@ -20,6 +21,8 @@ def test_graphrag_components():
         # Build sample graph if empty
         if graph_store.graph.number_of_nodes() == 0:
             print("   Building sample graph...")
+            # Örnek graph geçici dizine kaydedilir; takip edilen data/graph dosyası değişmez
+            graph_store = NetmeraGraphStore(graph_path=os.path.join(tempfile.mkdtemp(), "graph.pkl"))
             graph_store.build_sample_graph()
         
         stats = graph_store.get_stats()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test ImprovedRetrievalSystem caches: query embeddings (LRU), intent scores,
+docstore-id dedup and lowercased documents
+"""
+
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")  # OpenAIEmbeddings/ChatOpenAI oluşturulur ama çağrılmaz
+
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores import FAISS
+
+import src.improved_retrieval_system as irs
+from src.improved_retrieval_system import ImprovedRetrievalSystem
+
+DOCS = [
+    ("iOS SDK kurulum adımları", "https://docs/ios"),
+    ("Android push notification setup", "https://docs/android"),
+    ("Segment and campaign automation", "https://docs/segments"),
+    ("REST API authentication", "https://docs/api"),
+]
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    """Deterministic embeddings that record every embed_documents batch"""
+    calls: list = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return super().embed_documents(texts)
+
+def make_system():
+    """Retrieval system over a small in-memory FAISS store (no API calls)"""
+    system = ImprovedRetrievalSystem(faiss_store_path="/nonexistent/faiss_store")
+    system.embeddings = CountingEmbeddings(size=32, calls=[])
+    system.vectorstore = FAISS.from_texts(
+        [text for text, _ in DOCS],
+        DeterministicFakeEmbedding(size=32),
+        metadatas=[{"source": source} for _, source in DOCS],
+        ids=[f"doc-{i}" for i in range(len(DOCS))],
+    )
+    return system
+
+def test_query_embedding_cache():
+    """Only uncached queries are embedded, once per batch and once per text"""
+    print("🧮 Query Embedding Cache Test")
+    print("=" * 50)
+
+    system = make_system()
+    first = system._embed_queries(["a", "b", "a"])
+    second = system._embed_queries(["b", "c"])
+    print(f"embed_documents batches: {system.embeddings.calls}")
+    assert system.embeddings.calls == [["a", "b"], ["c"]]
+    assert first[0] is first[2] and first[1] is second[0]
+    assert first[0].dtype == "float32"
+
+    system.cache_clear()
+    system._embed_queries(["a"])
+    assert system.embeddings.calls[-1] == ["a"]
+
+def test_query_embedding_eviction():
+    """Least recently used embeddings are dropped at QUERY_EMBEDDING_CACHE_SIZE"""
+    print("\n♻️ Query Embedding Eviction Test")
+    print("=" * 50)
+
+    system = make_system()
+    original_size = irs.QUERY_EMBEDDING_CACHE_SIZE
+    irs.QUERY_EMBEDDING_CACHE_SIZE = 2
+    try:
+        system._embed_queries(["a", "b"])
+        system._embed_queries(["a"])  # "a" en yeni; "b" atılacak
+        system._embed_queries(["c"])
+        print(f"Cached queries: {list(system._embedding_cache)}")
+        assert list(system._embedding_cache) == ["a", "c"]
+
+        system._embed_queries(["a", "b"])
+        assert system.embeddings.calls[-1] == ["b"]
+    finally:
+        irs.QUERY_EMBEDDING_CACHE_SIZE = original_size
+
+def test_intent_and_document_caches():
+    """Intent scores are memoized; results dedup by docstore id; lowercased docs are cached and cleared"""
+    print("\n🎯 Intent/Document Cache Test")
+    print("=" * 50)
+
+    system = make_system()
+    first = system.detect_query_intent("Hangi platformları destekliyor?")
+    second = system.detect_query_intent("Hangi Platformları Destekliyor?")
+    assert first["primary_intent"]["intent"] == "platform"
+    assert second["all_intents"] == first["all_intents"]
+    assert system._intent_scores.cache_info().hits == 1
+
+    results = system.retrieve_with_multiple_queries(["ios sdk", "ios sdk kurulum", "push"], k=len(DOCS))
+    ids = [doc.id for doc, _, _ in results]
+    print(f"Result ids: {ids}")
+    assert len(ids) == len(set(ids)) == len(DOCS)
+    assert [score for _, score, _ in results] == sorted(score for _, score, _ in results)
+
+    reranked = system.rerank_results(results, "iOS SDK kurulum", first)
+    assert len(reranked) == len(DOCS)
+    assert system._lowered_docs["doc-0"] == ("ios sdk kurulum adımları", "https://docs/ios")
+
+    system.cache_clear()
+    assert system._lowered_docs == {}
+    assert len(system._embedding_cache) == 0
+    assert system._intent_scores.cache_info().currsize == 0
+
+if __name__ == "__main__":
+    test_query_embedding_cache()
+    test_query_embedding_eviction()
+    test_intent_and_document_caches()
+    print("\n✅ Improved retrieval cache tests completed!")
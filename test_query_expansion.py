@@ -68,5 +68,75 @@ def test_query_expansion():
     
     print("\n✅ Query expansion test completed!")
 
+def test_expansion_skips_terms_already_in_query():
+    """Only whole words/phrases already in the query suppress an expansion term"""
+    print("\n🧩 Expansion Term Filter Test")
+    print("=" * 50)
+
+    expander = QueryExpander()
+    assert "push notification" not in expander.expand_query("Push Notification nedir").added_terms
+    added = expander.expand_query("push notifications").added_terms
+    print(f"'push notifications' -> {added}")
+    assert "push notification" in added  # "notifications" içinde geçmesi yetmez
+
+def test_query_analysis_cache():
+    """Repeated queries reuse memoized expansion and routing results"""
+    print("\n🗃️ Query Analysis Cache Test")
+    print("=" * 50)
+
+    from src.graphrag.query_router import QueryRouter
+
+    expander = QueryExpander()
+    first = expander.expand_query("push bildirim")
+    assert expander.expand_query("push bildirim") is first
+    assert expander.expand_query("push bildirim", max_expansion_terms=2) is not first
+    expander.cache_clear()
+    assert expander.expand_query("push bildirim") is not first
+
+    batch = expander.expand_queries(["push bildirim", "iOS kurulum", "push bildirim"])
+    assert batch[0] is batch[2] is expander.expand_query("push bildirim")
+    assert batch[1].original_query == "iOS kurulum"
+
+    router = QueryRouter()
+    routing = router.route_query("  iOS ve Android entegrasyonu nasıl? ")
+    routing["strategy"] = None  # Çağıranın değişikliği cache'e sızmaz
+    again = router.route_query("ios ve android entegrasyonu nasıl?")
+    print(f"Route: {again['route_type'].value} / {again['strategy'].value}")
+    assert again["strategy"] is not None
+    assert router._route_cached.cache_info().hits == 1
+
+    from src.graphrag.query_expansion import get_expander
+    from src.graphrag.query_router import get_router
+    assert get_router() is get_router()
+    assert get_expander() is get_expander()
+
+def test_router_pattern_set_matches_each_pattern():
+    """Fused word-list matching reports the same patterns as searching them one by one"""
+    print("\n🧵 Router Pattern Set Test")
+    print("=" * 50)
+
+    import re
+    from src.graphrag.query_router import QueryRouter
+
+    router = QueryRouter()
+    queries = [
+        "SDK kurulum adımları: önce gradle, sonra manifest",
+        "iOS ve Android akış farkı nedir",
+        "ön koşul ve her ikisi birlikte",
+        "what is the default value, explain with an example",
+        "push notification feature documentation",
+        "",
+    ]
+    for patterns, pattern_set in ((router.graph_patterns, router.graph_pattern_set),
+                                  (router.vector_patterns, router.vector_pattern_set)):
+        compiled = [re.compile(p, re.IGNORECASE | re.MULTILINE) for p in patterns]
+        for query in queries:
+            expected = [i for i, pattern in enumerate(compiled) if pattern.search(query)]
+            assert pattern_set.matching(query) == expected, (query, expected)
+    print(f"{len(queries)} queries matched identically")
+
 if __name__ == "__main__":
     test_query_expansion()
+    test_expansion_skips_terms_already_in_query()
+    test_query_analysis_cache()
+    test_router_pattern_set_matches_each_pattern()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test in-flight request coalescing for identical LLM calls
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.graph.request_coalescer import RequestCoalescer
+
+MESSAGES = [{"role": "system", "content": "sys"}, {"role": "user", "content": "Soru: SDK?"}]
+
+def test_sync_coalescing():
+    """Concurrent identical calls run once; errors reach every waiter"""
+    print("🔗 Sync Request Coalescing Test")
+    print("=" * 50)
+
+    coalescer = RequestCoalescer()
+    key = RequestCoalescer.make_key("gpt", messages=MESSAGES)
+    assert key == RequestCoalescer.make_key("gpt", messages=list(MESSAGES))
+    assert key != RequestCoalescer.make_key("gpt", messages=MESSAGES[1:])
+
+    calls = []
+    started = threading.Event()
+
+    def slow_call():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return "answer"
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        leader = pool.submit(coalescer.run, key, slow_call)
+        started.wait()
+        followers = [pool.submit(coalescer.run, key, slow_call) for _ in range(3)]
+        results = [leader.result()] + [f.result() for f in followers]
+
+    print(f"Results: {results}, LLM calls: {len(calls)}")
+    assert len(calls) == 1
+    assert results[0] == ("answer", False)
+    assert all(result == ("answer", True) for result in results[1:])
+    assert len(coalescer) == 0
+
+    def failing_call():
+        raise RuntimeError("rate limited")
+
+    try:
+        coalescer.run(key, failing_call)
+        assert False, "exception should propagate"
+    except RuntimeError:
+        pass
+    assert len(coalescer) == 0
+
+def test_async_coalescing():
+    """Concurrent ainvoke-style callers share one awaited call"""
+    print("\n⚡ Async Request Coalescing Test")
+    print("=" * 50)
+
+    coalescer = RequestCoalescer()
+    key = RequestCoalescer.make_key("gpt", messages=MESSAGES)
+    calls = []
+
+    async def slow_call():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return "answer"
+
+    async def main():
+        return await asyncio.gather(*(coalescer.arun(key, slow_call) for _ in range(5)))
+
+    results = asyncio.run(main())
+    print(f"Results: {results}, LLM calls: {len(calls)}")
+    assert len(calls) == 1
+    assert sum(coalesced for _, coalesced in results) == 4
+    assert all(answer == "answer" for answer, _ in results)
+
+def test_leader_cancellation():
+    """Cancelling the leader does not cancel waiters; a cancelled call is retried"""
+    print("\n🛑 Leader Cancellation Test")
+    print("=" * 50)
+
+    coalescer = RequestCoalescer()
+    key = RequestCoalescer.make_key("gpt", messages=MESSAGES)
+    calls = []
+
+    async def slow_call():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return "answer"
+
+    async def leader_cancelled():
+        leader = asyncio.ensure_future(coalescer.arun(key, slow_call))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(coalescer.arun(key, slow_call))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        result = await follower
+        assert leader.cancelled()
+        return result
+
+    result = asyncio.run(leader_cancelled())
+    print(f"Follower after leader cancel: {result}, LLM calls: {len(calls)}")
+    assert result == ("answer", True)
+    assert len(calls) == 1
+    assert len(coalescer) == 0
+
+    # Çağrının kendisi iptal olursa bekleyen yeni lider olarak tekrar dener
+    attempts = []
+
+    async def cancelled_once():
+        attempts.append(1)
+        await asyncio.sleep(0.05)
+        if len(attempts) == 1:
+            raise asyncio.CancelledError()
+        return "retried"
+
+    async def call_cancelled():
+        leader = asyncio.ensure_future(coalescer.arun(key, cancelled_once))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(coalescer.arun(key, cancelled_once))
+        try:
+            await leader
+            assert False, "leader should see its own cancellation"
+        except asyncio.CancelledError:
+            pass
+        return await follower
+
+    result = asyncio.run(call_cancelled())
+    print(f"Follower after call cancel: {result}, attempts: {len(attempts)}")
+    assert result == ("retried", False)
+    assert len(attempts) == 2
+    assert len(coalescer) == 0
+
+if __name__ == "__main__":
+    test_sync_coalescing()
+    test_async_coalescing()
+    test_leader_cancellation()
+    print("\n✅ Request coalescer tests completed!")
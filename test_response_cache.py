@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test semantic response/retrieval cache hit/miss, TTL and eviction behaviour
+"""
+
+import time
+
+from src.graph.response_cache import SemanticCache, SemanticResponseCache
+
+class KeywordEmbeddings:
+    """Deterministic bag-of-keywords embeddings (no API calls)"""
+    vocab = ["sdk", "ios", "android", "push", "segment", "kurulum", "setup"]
+
+    def embed_query(self, text):
+        words = text.lower().split()
+        return [float(words.count(term)) + 0.01 for term in self.vocab]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+def test_cache_hit_and_language_isolation():
+    """Same query hits; same query in another language does not"""
+    print("⚡ Response Cache Hit Test")
+    print("=" * 50)
+
+    cache = SemanticResponseCache(KeywordEmbeddings(), threshold=0.95)
+
+    vector = cache.embed("ios sdk kurulum")
+    assert cache.get(vector, "Türkçe") is None
+
+    cache.put(vector, "Türkçe", "iOS SDK cevabı", ["https://docs/ios"])
+    hit = cache.get(cache.embed("kurulum ios sdk"), "Türkçe")
+    print(f"Hit: {hit}")
+    assert hit is not None and hit.answer == "iOS SDK cevabı"
+    assert hit.citations == ["https://docs/ios"]
+
+    assert cache.get(vector, "English") is None
+    assert cache.get(cache.embed("android push"), "Türkçe") is None
+
+def test_cache_ttl_and_eviction():
+    """Expired entries are dropped and size stays bounded"""
+    print("\n⏱️ Response Cache TTL/Eviction Test")
+    print("=" * 50)
+
+    cache = SemanticResponseCache(KeywordEmbeddings(), threshold=0.95, ttl_seconds=0.05, max_entries=2)
+
+    cache.put(cache.embed("ios"), "English", "a", [])
+    time.sleep(0.1)
+    assert cache.get(cache.embed("ios"), "English") is None
+    assert len(cache) == 0
+
+    cache.ttl_seconds = 300
+    for query in ["ios", "android", "push"]:
+        cache.put(cache.embed(query), "English", query, [])
+    print(f"Entries after 3 puts (max 2): {len(cache)}")
+    assert len(cache) == 2
+    assert cache.get(cache.embed("ios"), "English") is None  # En eski girdi atıldı
+    assert cache.get(cache.embed("push"), "English").answer == "push"
+
+def test_retrieval_cache_skips_retriever():
+    """Equivalent queries reuse docs/confidence without calling the retriever"""
+    print("\n🔁 Retrieval Cache Test")
+    print("=" * 50)
+
+    from src.graph.app_graph import RetrieveNode
+
+    class CountingRetriever:
+        calls = 0
+        vectors = []
+
+        def retrieve(self, query, k=10, query_vector=None):
+            CountingRetriever.calls += 1
+            CountingRetriever.vectors.append(query_vector)
+            return [{"text": query, "url": "https://docs/ios", "score": 0.9}]
+
+    node = RetrieveNode(CountingRetriever(), SemanticCache(KeywordEmbeddings(), threshold=0.95))
+    first = node({"translated_query": "ios sdk kurulum", "lang": "Türkçe"})
+    second = node({"translated_query": "kurulum ios sdk", "lang": "Türkçe"})
+    other = node({"translated_query": "ios sdk kurulum", "lang": "English"})
+
+    print(f"Retriever calls: {CountingRetriever.calls}")
+    assert CountingRetriever.calls == 2  # Farklı dil ayrı girdi
+    assert second["docs"] is first["docs"]
+    assert second["retrieval_conf"] == first["retrieval_conf"]
+    assert second["primary_url"] == "https://docs/ios"
+    assert (CountingRetriever.vectors[0] == first["retrieval_embedding"][0]).all()  # Retriever yeniden embed etmez
+    # Response cache graph dışındaki çağrılarla aynı anahtarı kullanır: translated_query embedding'i
+    assert (first["query_embedding"] == SemanticCache(KeywordEmbeddings()).embed("ios sdk kurulum")).all()
+    assert not (first["query_embedding"] == first["retrieval_embedding"]).all()  # preprocess_query "setup" ekler
+    assert other["docs"] is not first["docs"]
+
+if __name__ == "__main__":
+    test_cache_hit_and_language_isolation()
+    test_cache_ttl_and_eviction()
+    test_retrieval_cache_skips_retriever()
+    print("\n✅ Response cache tests completed!")